@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from . import renditions
+from .models import ImageBlob, Post
+
+
+def _storage():
+    return Post._meta.get_field("image").storage
+
+
+def acquire(name):
+    """Учитывает новую ссылку поста на файл картинки."""
+    if not _storage().is_blob(name):
+        return
+    blob, created = ImageBlob.objects.get_or_create(
+        name=name, defaults={"refcount": 1}
+    )
+    if not created:
+        ImageBlob.objects.filter(pk=blob.pk).update(
+            refcount=F("refcount") + 1
+        )
+
+
+def release(name):
+    """Снимает ссылку на файл; файл без ссылок удаляется после коммита."""
+    if not _storage().is_blob(name):
+        return
+    ImageBlob.objects.filter(name=name).update(
+        refcount=Greatest(F("refcount") - 1, 0)
+    )
+    transaction.on_commit(lambda: purge(name))
+
+
+def purge(name):
+    """Удаляет файл и его миниатюры, если на него никто не ссылается."""
+    deleted, _ = ImageBlob.objects.filter(name=name, refcount=0).delete()
+    if deleted:
+        _storage().delete(name)
+        renditions.delete(name)
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from yatube.replicas import reading_replicas
+
+from .feed_cache import generations
+from .renditions import resolve
+
+
+def _key(post_id, cards, version):
+    return f"card:{post_id}:{cards}:{version}"
+
+
+def render_cards(posts):
+    """HTML карточек постов ленты из includes/post_item.html.
+
+    Карточка одна на все ленты и всех зрителей: ключ — id поста и
+    поколение post:<id>, которое сдвигается при правке поста, новом
+    комментарии и готовой миниатюре, а поколение cards — при смене
+    имени автора или названия группы. Версии и карточки читаются
+    двумя запросами к кэшу на страницу, рисуются только промахи.
+    Ссылка «Редактировать» остается в карточке меткой posts.page_cache.
+    """
+    posts = list(posts)
+    cards, *versions = generations(
+        "cards", *(f"post:{post.pk}" for post in posts)
+    )
+    keys = [
+        _key(post.pk, cards, version)
+        for post, version in zip(posts, versions)
+    ]
+    found = cache.get_many(keys)
+    missing = [
+        (key, post) for key, post in zip(keys, posts) if key not in found
+    ]
+    if missing:
+        resolve(post for _, post in missing)
+        rendered = {
+            key: render_to_string(
+                "includes/post_item.html",
+                {"post": post, "punch_holes": True}
+            )
+            for key, post in missing
+        }
+        if not reading_replicas():
+            cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+        found.update(rendered)
+    return "".join(found[key] for key in keys)
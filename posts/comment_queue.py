@@ -0,0 +1,280 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.db.models import Case, DateTimeField, Value, When
+
+from . import counters, feed_cache, markup, trending
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+Queued = namedtuple("Queued", "id post_id author_id text created uid")
+
+COLUMNS = "id, post_id, author_id, text, created, uid"
+
+_queues = {}
+_queues_lock = threading.Lock()
+_flusher = None
+
+
+class CommentQueue:
+    """Журнал комментариев, еще не записанных в основную базу.
+
+    Это отдельный файл SQLite в режиме WAL: запись в него не ждет
+    блокировок основной базы и переживает перезапуск процесса. Каждая
+    запись получает случайный uid, по которому ее узнает основная база.
+    Разбирать очередь могут несколько процессов: каждый забирает свою
+    порцию через claim.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "post_id INTEGER NOT NULL, "
+                "author_id INTEGER NOT NULL, "
+                "text TEXT NOT NULL, "
+                "created TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS queue_post_author "
+                "ON queue (post_id, author_id)"
+            )
+            # Колонки, которых нет в очередях старых версий.
+            columns = {
+                row[1] for row in connection.execute(
+                    "PRAGMA table_info(queue)"
+                )
+            }
+            for column, sql_type in (
+                ("uid", "TEXT"), ("claimed_by", "TEXT"),
+                ("claimed_at", "REAL"),
+            ):
+                if column not in columns:
+                    connection.execute(
+                        f"ALTER TABLE queue ADD COLUMN {column} {sql_type}"
+                    )
+            connection.execute(
+                "UPDATE queue SET uid = lower(hex(randomblob(16))) "
+                "WHERE uid IS NULL"
+            )
+
+    def connection(self):
+        # sqlite3-соединение нельзя делить между потоками.
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            self.local.connection = connection
+        return connection
+
+    def put(self, post_id, author_id, text):
+        created = datetime.now(timezone.utc)
+        uid = uuid.uuid4().hex
+        with self.connection() as connection:
+            cursor = connection.execute(
+                "INSERT INTO queue (post_id, author_id, text, created, uid) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (post_id, author_id, text, created.isoformat(), uid)
+            )
+        return Queued(
+            cursor.lastrowid, post_id, author_id, text, created, uid
+        )
+
+    def _fetch(self, sql, params):
+        rows = self.connection().execute(sql, params).fetchall()
+        return [
+            Queued(*row[:4], datetime.fromisoformat(row[4]), row[5])
+            for row in rows
+        ]
+
+    def pending(self, post_id, author_id):
+        """Комментарии автора к посту, которые еще ждут записи."""
+        return self._fetch(
+            f"SELECT {COLUMNS} FROM queue WHERE post_id = ? "
+            "AND author_id = ? ORDER BY id DESC",
+            (post_id, author_id)
+        )
+
+    def batch(self, limit):
+        return self._fetch(
+            f"SELECT {COLUMNS} FROM queue ORDER BY id LIMIT ?", (limit,)
+        )
+
+    def claim(self, limit):
+        """Забирает порцию записей, не занятых другими процессами.
+
+        BEGIN IMMEDIATE берет блокировку записи сразу, поэтому две
+        порции не пересекаются. Записи, которые процесс забрал, но не
+        отметил done за COMMENTS_CLAIM_TIMEOUT, забираются снова.
+        """
+        token = uuid.uuid4().hex
+        now = time.time()
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "UPDATE queue SET claimed_by = ?, claimed_at = ? "
+                "WHERE id IN (SELECT id FROM queue "
+                "WHERE claimed_by IS NULL OR claimed_at < ? "
+                "ORDER BY id LIMIT ?)",
+                (token, now, now - settings.COMMENTS_CLAIM_TIMEOUT, limit)
+            )
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+        return self._fetch(
+            f"SELECT {COLUMNS} FROM queue WHERE claimed_by = ? "
+            "ORDER BY id",
+            (token,)
+        )
+
+    def done(self, ids):
+        with self.connection() as connection:
+            connection.executemany(
+                "DELETE FROM queue WHERE id = ?", [(pk,) for pk in ids]
+            )
+
+
+def get_queue():
+    path = settings.COMMENTS_QUEUE_PATH
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = CommentQueue(path)
+        return _queues[path]
+
+
+def enqueue(post_id, author_id, text):
+    """Ставит комментарий в очередь и запускает фоновую запись."""
+    queued = get_queue().put(post_id, author_id, text)
+    start_flusher()
+    return queued
+
+
+def pending_comments(post, user):
+    """Еще не записанные комментарии пользователя к посту.
+
+    Автор видит свои комментарии сразу, не дожидаясь записи в базу.
+    """
+    if not user.is_authenticated:
+        return []
+    return [
+        Comment(post=post, author=user, text=item.text, created=item.created)
+        for item in get_queue().pending(post.pk, user.pk)
+    ]
+
+
+def _write(comments):
+    """Записывает комментарии и возвращает их число по постам."""
+    if not comments:
+        return {}
+    created = {comment.queue_uid: comment.created for comment in comments}
+    Comment.objects.bulk_create(comments)
+    # auto_now_add заменяет created временем записи, поэтому время
+    # из очереди возвращается отдельным UPDATE в той же транзакции.
+    Comment.objects.filter(queue_uid__in=created).update(created=Case(
+        *(When(queue_uid=uid, then=Value(value))
+          for uid, value in created.items()),
+        output_field=DateTimeField()
+    ))
+    added = {}
+    for comment in comments:
+        comment.created = created[comment.queue_uid]
+        added[comment.post_id] = added.get(comment.post_id, 0) + 1
+    for post_id, count in added.items():
+        counters.bump_post(post_id, comments_count=count)
+    return added
+
+
+def flush(limit=None):
+    """Переносит порцию комментариев из очереди в базу одним bulk_create.
+
+    bulk_create не отправляет сигналы, поэтому HTML текста, счетчики
+    и кэш лент обновляются здесь. Комментарий получает время постановки
+    в очередь и uid записи очереди. Порцию процесс забирает через
+    CommentQueue.claim. Если процесс упал между коммитом и очисткой
+    очереди, при повторе уже записанные uid пропускаются. Их проверка
+    идет в той же транзакции, а уникальный Comment.queue_uid не дает
+    записать комментарий дважды. Одинаковые комментарии подряд
+    записываются все. Возвращает число обработанных записей очереди.
+    """
+    queue = get_queue()
+    items = queue.claim(limit or settings.COMMENTS_FLUSH_BATCH)
+    if not items:
+        return 0
+    posts = {
+        post["pk"]: post
+        for post in Post.objects.filter(
+            pk__in={item.post_id for item in items}
+        ).values("pk", "author_id", "group_id")
+    }
+    authors = set(User.objects.filter(
+        pk__in={item.author_id for item in items}
+    ).values_list("pk", flat=True))
+    with transaction.atomic():
+        written = set(Comment.objects.filter(
+            queue_uid__in=[item.uid for item in items]
+        ).values_list("queue_uid", flat=True))
+        comments = [
+            Comment(
+                post_id=item.post_id, author_id=item.author_id,
+                text=item.text, text_html=markup.render(item.text),
+                queue_uid=item.uid, created=item.created
+            )
+            for item in items
+            if item.post_id in posts
+            and item.author_id in authors
+            and item.uid not in written
+        ]
+        added = _write(comments)
+    for post_id in added:
+        post = posts[post_id]
+        feed_cache.bump(
+            *feed_cache.post_scopes(
+                post["author_id"], post["group_id"], post_id
+            )
+        )
+    for comment in comments:
+        trending.record_comment(comment, posts[comment.post_id]["group_id"])
+    queue.done([item.id for item in items])
+    return len(items)
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.COMMENTS_FLUSH_INTERVAL)
+        try:
+            while flush() >= settings.COMMENTS_FLUSH_BATCH:
+                pass
+        except Exception:
+            logger.exception("Не удалось записать комментарии из очереди")
+        finally:
+            close_old_connections()
+
+
+def start_flusher():
+    global _flusher
+    # Без интервала очередь разбирает только команда flush_comments.
+    if settings.COMMENTS_FLUSH_INTERVAL is None:
+        return
+    with _queues_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flush_forever, name="comments-flusher", daemon=True
+            )
+            _flusher.start()
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def _shift(model, filters, deltas):
+    model.objects.filter(**filters).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def bump_post(post_id, **deltas):
+    _shift(Post, {"pk": post_id}, deltas)
+
+
+def bump_user(user_id, **deltas):
+    # Недостающие строки создает rebuild_counters или user_stats.
+    _shift(UserStats, {"user_id": user_id}, deltas)
+
+
+def _count(model, field, outer="pk"):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+                field
+            ).annotate(total=Count("pk")).values("total")
+        ),
+        0
+    )
+
+
+def recount_follows(user_ids):
+    """Пересчитывает счетчики подписок пользователей одним UPDATE.
+
+    Для пачек подписок: в отличие от bump_user не расходится с таблицей
+    подписок, даже если те же подписки параллельно меняет другой запрос.
+    """
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        followers_count=_count(Follow, "author", "user_id"),
+        following_count=_count(Follow, "user", "user_id"),
+    )
+
+
+def rebuild_user_stats(user_id):
+    counts = User.objects.filter(pk=user_id).aggregate(
+        posts_count=Count("posts", distinct=True),
+        followers_count=Count("following", distinct=True),
+        following_count=Count("follower", distinct=True),
+    )
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=counts
+    )
+    return stats
+
+
+def user_stats(user):
+    """Счетчики пользователя; отсутствующая строка пересчитывается."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        user.stats = rebuild_user_stats(user.pk)
+        return user.stats
+
+
+def rebuild():
+    """Пересчитывает все денормализованные счетчики."""
+    Post.objects.update(comments_count=_count(Comment, "post"))
+    existing = UserStats.objects.values("user_id")
+    UserStats.objects.bulk_create(
+        UserStats(user_id=user_id)
+        for user_id in User.objects.exclude(pk__in=existing).values_list(
+            "pk", flat=True
+        )
+    )
+    UserStats.objects.update(
+        posts_count=_count(Post, "author", "user_id"),
+        followers_count=_count(Follow, "author", "user_id"),
+        following_count=_count(Follow, "user", "user_id"),
+    )
@@ -0,0 +1,134 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+
+from .comment_queue import get_queue
+from .feed_cache import generations
+from .models import Group, Post
+
+User = get_user_model()
+
+
+def _etag(request, page, scopes, extra=()):
+    """ETag страницы для условного GET.
+
+    Собирается из поколений областей posts.feed_cache, которые сигналы
+    сдвигают при любом изменении постов, комментариев, картинок
+    и подписок, из пути и параметров запроса и из зрителя с его сессией
+    и CSRF-cookie. Это одно чтение из кэша и самое большее один запрос
+    по индексу, поэтому ответ 304 отдается раньше, чем view начнет
+    выбирать посты и рисовать шаблон.
+    """
+    if scopes is None:
+        return None
+    viewer = request.user.pk or 0
+    parts = [page, request.path, request.GET.urlencode(), viewer, *extra]
+    if viewer:
+        # Кнопки подписки и рекомендации зависят от подписок зрителя.
+        scopes = [*scopes, f"follow:{viewer}"]
+        # В форме комментария CSRF-токен, который меняется при входе:
+        # со старой страницей из 304 форма получила бы 403. get_token
+        # заводит секрет до рендера, и страница получает этот же секрет.
+        get_token(request)
+        parts += [request.session.session_key, request.META["CSRF_COOKIE"]]
+    parts.extend(generations(*scopes))
+    return hashlib.md5(
+        ":".join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def _cached_id(key, queryset):
+    # id по slug или username почти не меняется, поэтому запрос за ним
+    # нужен только при промахе кэша. Поколение "ids" сдвигают сигналы
+    # при переименовании и удалении.
+    key = "{}:{}".format(key, *generations("ids"))
+    value = cache.get(key)
+    if value is None:
+        value = queryset.first()
+        if value is not None:
+            cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+    return value
+
+
+# Области posts.feed_cache, от которых зависит страница; None — страницы
+# нет. По ним же строит ключ posts.page_cache.
+def index_scopes(request):
+    return ["posts"]
+
+
+def group_scopes(request, slug):
+    group_id = _cached_id(
+        f"group-id:{slug}",
+        Group.objects.filter(slug=slug).values_list("pk", flat=True)
+    )
+    if group_id is None:
+        return None
+    return [f"group:{group_id}"]
+
+
+def profile_scopes(request, username):
+    author_id = _cached_id(
+        f"user-id:{username}",
+        User.objects.filter(username=username).values_list("pk", flat=True)
+    )
+    if author_id is None:
+        return None
+    return [f"author:{author_id}"]
+
+
+def _post_author(username, post_id):
+    return _cached_id(
+        f"post-author:{username}:{post_id}",
+        Post.objects.filter(
+            pk=post_id, author__username=username
+        ).values_list("author_id", flat=True)
+    )
+
+
+def post_view_scopes(request, username, post_id):
+    author_id = _post_author(username, post_id)
+    if author_id is None:
+        return None
+    return [f"author:{author_id}", f"post:{post_id}"]
+
+
+def post_comments_scopes(request, username, post_id):
+    if _post_author(username, post_id) is None:
+        return None
+    return [f"post:{post_id}"]
+
+
+def index_etag(request):
+    return _etag(request, "index", index_scopes(request))
+
+
+def group_etag(request, slug):
+    return _etag(request, "group", group_scopes(request, slug))
+
+
+def profile_etag(request, username):
+    return _etag(request, "profile", profile_scopes(request, username))
+
+
+def post_etag(request, username, post_id):
+    extra = ()
+    if settings.COMMENTS_WRITE_BEHIND and request.user.is_authenticated:
+        # Свои комментарии из очереди автор видит до записи в базу.
+        extra = (len(get_queue().pending(post_id, request.user.pk)),)
+    return _etag(
+        request, "post", post_view_scopes(request, username, post_id),
+        extra=extra
+    )
+
+
+def post_comments_etag(request, username, post_id):
+    return _etag(
+        request, "comments", post_comments_scopes(request, username, post_id)
+    )
+
+
+def follow_etag(request):
+    return _etag(request, "follow", [f"follow:{request.user.pk}", "posts"])
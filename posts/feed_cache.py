@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from yatube.replicas import reading_replicas
+
+from .models import Post
+
+
+def _generation_key(scope):
+    return f"feed-gen:{scope}"
+
+
+def _fresh_generation():
+    # Счетчик начинается с текущего времени: после вытеснения ключа
+    # из кэша новая серия не совпадет со старыми фрагментами.
+    return time.time_ns()
+
+
+def generations(*scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    missing = {
+        key: _fresh_generation() for key in keys if key not in values
+    }
+    if missing:
+        cache.set_many(missing, None)
+        values.update(missing)
+    return [values[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сбрасывает закэшированные ленты перечисленных областей."""
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_generation(), None)
+
+
+def post_scopes(author_id, group_id, post_id=None):
+    """Области лент, в которых выводится пост, и его карточки."""
+    scopes = ["posts", f"author:{author_id}"]
+    if group_id is not None:
+        scopes.append(f"group:{group_id}")
+    if post_id is not None:
+        scopes.append(f"post:{post_id}")
+    return scopes
+
+
+def bump_post(post_id):
+    """Сбрасывает ленты, в которых выводится пост, и его карточку."""
+    post = Post.objects.filter(pk=post_id).values(
+        "author_id", "group_id"
+    ).first()
+    if post is not None:
+        bump(*post_scopes(post["author_id"], post["group_id"], post_id))
+
+
+def feed_cache(request, page, feed, *scopes):
+    """Контекст для {% cache %} ленты.
+
+    Ключ учитывает тип ленты, страницу или курсор, зрителя и поколения
+    областей, которые меняются сигналами из posts.signals.
+    """
+    if page.number is None:
+        position = "after:{}|before:{}".format(
+            request.GET.get("after"), request.GET.get("before")
+        )
+    else:
+        position = f"page:{page.number}"
+    # Общую страницу из posts.page_cache рисуют для анонима, но вместо
+    # частей зрителя в ней метки, поэтому и фрагменты у нее свои.
+    if getattr(request, "page_holes", False):
+        viewer = "holes"
+    else:
+        viewer = request.user.pk or 0
+    parts = [feed, position, viewer]
+    parts.extend(generations(*scopes))
+    return {
+        "feed_cache_key": ":".join(str(part) for part in parts),
+        # С нулевым сроком {% cache %} отдает готовый фрагмент, но
+        # нарисованный по реплике не сохраняет.
+        "feed_cache_timeout": (
+            0 if reading_replicas() else settings.FEED_CACHE_TIMEOUT
+        ),
+    }
@@ -0,0 +1,92 @@
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Follow
+
+# Подписки, загруженные этим процессом: user_id -> (срок, frozenset).
+_local = {}
+_local_lock = threading.Lock()
+
+
+def _key(user_id):
+    return f"followees:{user_id}"
+
+
+def _load(user_id):
+    # Кэш заполняется из основной базы: отставшая реплика закэшировала
+    # бы устаревшие подписки до следующей подписки пользователя. Не через
+    # router.db_for_write: он считает это записью и закрепляет зрителя
+    # за основной базой.
+    ids = Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id
+    ).values_list("author_id", flat=True)
+    return array("q", sorted(ids))
+
+
+def _remember(user_id, followees):
+    timeout = settings.FOLLOW_GRAPH_LOCAL_TIMEOUT
+    if not timeout:
+        return
+    with _local_lock:
+        _local[user_id] = (time.monotonic() + timeout, followees)
+
+
+def followees(user_id):
+    """ID авторов, на которых подписан пользователь.
+
+    Сначала проверяется память процесса, затем общий кэш, где подписки
+    лежат отсортированным массивом, и только потом база. В памяти
+    процесса запись живет FOLLOW_GRAPH_LOCAL_TIMEOUT секунд: подписку,
+    сделанную через другой процесс, этот увидит с такой задержкой.
+    """
+    entry = _local.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    ids = cache.get(_key(user_id))
+    if ids is None:
+        ids = _load(user_id)
+        cache.set(_key(user_id), ids, None)
+    result = frozenset(ids)
+    _remember(user_id, result)
+    return result
+
+
+def is_following(user, author_id):
+    if not user.is_authenticated:
+        return False
+    return author_id in followees(user.pk)
+
+
+def following(user, author_ids):
+    """Те из author_ids, на кого подписан пользователь, за одно чтение."""
+    if not user.is_authenticated:
+        return set()
+    return followees(user.pk) & set(author_ids)
+
+
+def refresh(*user_ids):
+    """Перечитывает подписки пользователей после их изменения."""
+    loaded = {user_id: _load(user_id) for user_id in user_ids}
+    cache.set_many(
+        {_key(user_id): ids for user_id, ids in loaded.items()}, None
+    )
+    for user_id, ids in loaded.items():
+        _remember(user_id, frozenset(ids))
+
+
+def forget(user_id):
+    """Сбрасывает закэшированные подписки пользователя."""
+    with _local_lock:
+        _local.pop(user_id, None)
+    cache.delete(_key(user_id))
+
+
+def clear_local():
+    """Очищает память процесса, общий кэш не трогается."""
+    with _local_lock:
+        _local.clear()
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+
+from . import counters, feed_cache, follow_graph, recommendations, timeline
+from .models import Follow
+
+User = get_user_model()
+
+
+def _authors(user, usernames):
+    """id авторов по именам одним запросом; себя подписать нельзя."""
+    return dict(
+        User.objects.filter(username__in=set(usernames)).exclude(
+            pk=user.pk
+        ).values_list("pk", "username")
+    )
+
+
+def _followees(user, authors):
+    return set(Follow.objects.filter(
+        user=user, author_id__in=authors
+    ).values_list("author_id", flat=True))
+
+
+def _delete(user, authors):
+    """Удаляет подписки без сигналов post_delete, одним DELETE."""
+    connection = connections[router.db_for_write(Follow)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM {} WHERE user_id = %s AND author_id IN ({})".format(
+                connection.ops.quote_name(Follow._meta.db_table),
+                ", ".join(["%s"] * len(authors))
+            ),
+            [user.pk, *authors]
+        )
+
+
+def _changed(user, author_ids):
+    # Кэши сбрасываются один раз на всю пачку, а не на каждого автора.
+    # Счетчики подписок есть в карточке автора на страницах профиля
+    # и поста, которые кэшируются по области author:<id>.
+    feed_cache.bump(
+        f"follow:{user.pk}", f"author:{user.pk}",
+        *(f"author:{pk}" for pk in author_ids)
+    )
+    follow_graph.refresh(user.pk)
+    recommendations.refresh(user.pk)
+
+
+def follow_many(user, usernames):
+    """Подписывает пользователя на авторов из usernames.
+
+    Повторная подписка ничего не меняет. Возвращает имена авторов,
+    на которых пользователь подписался этим вызовом.
+    """
+    authors = _authors(user, usernames)
+    with transaction.atomic():
+        existing = _followees(user, authors)
+        if not set(authors) - existing:
+            return []
+        # bulk_create не отправляет сигналы, поэтому все, что делает
+        # follow_created, повторяется здесь для всей пачки сразу.
+        Follow.objects.bulk_create(
+            (Follow(user=user, author_id=pk) for pk in authors
+             if pk not in existing),
+            ignore_conflicts=True
+        )
+        # ignore_conflicts молча пропускает подписки, которые успел
+        # создать параллельный запрос, поэтому счетчики пересчитываются
+        # по таблице, а не сдвигаются на размер пачки.
+        added = sorted(_followees(user, authors) - existing)
+        counters.recount_follows([user.pk, *added])
+        timeline.backfill(user.pk, *added)
+    _changed(user, added)
+    return sorted(authors[pk] for pk in added)
+
+
+def unfollow_many(user, usernames):
+    """Отписывает пользователя от авторов из usernames.
+
+    Возвращает имена авторов, от которых пользователь отписался.
+    """
+    authors = _authors(user, usernames)
+    with transaction.atomic():
+        removed = sorted(_followees(user, authors))
+        if not removed:
+            return []
+        # Обычный delete() отправил бы post_delete на каждую подписку.
+        _delete(user, removed)
+        counters.recount_follows([user.pk, *removed])
+        timeline.prune(user.pk, *removed)
+        timeline.refill(*removed)
+    _changed(user, removed)
+    return sorted(authors[pk] for pk in removed)
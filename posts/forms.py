@@ -8,6 +8,18 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("group", "text", "image")
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Файл, отклоненный ImageUploadHandler, приходит пустым, и
+        # ImageField пишет, что он пуст. Вместо этого форма показывает
+        # причину отказа, см. posts.uploads.
+        upload = self.files.get(self.add_prefix("image"))
+        error = getattr(upload, "upload_error", None)
+        if error is not None:
+            self.errors.pop("image", None)
+            self.add_error("image", error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import feed_cache, renditions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает недостающие миниатюры картинок постов "
+        "параллельно на всех ядрах процессора."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Число процессов, по умолчанию — число ядер."
+        )
+
+    def handle(self, *args, **options):
+        images = {}
+        posts = Post.objects.exclude(image="").values_list(
+            "image", "author_id", "group_id", "id"
+        )
+        for image, author_id, group_id, post_id in posts.iterator():
+            images.setdefault(image, set()).update(
+                feed_cache.post_scopes(author_id, group_id, post_id)
+            )
+        # Дочерним процессам база не нужна, соединения не должны
+        # наследоваться через fork.
+        connections.close_all()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = {
+                pool.submit(renditions.generate, image): image
+                for image in images
+            }
+            for future, image in futures.items():
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(
+                        f"{image}: {future.exception()}"
+                    )
+                    continue
+                feed_cache.bump(*images[image])
+        self.stdout.write(self.style.SUCCESS(
+            f"Миниатюры готовы: {len(images) - failed} из {len(images)}."
+        ))
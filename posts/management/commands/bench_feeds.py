@@ -0,0 +1,187 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections, DatabaseError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+# Стандартный бэкенд без повторного использования соединений против
+# yatube.sqlite с WAL и CONN_MAX_AGE.
+CONFIGS = {
+    "django.db.backends.sqlite3": {"CONN_MAX_AGE": 0},
+    "yatube.sqlite": {"CONN_MAX_AGE": 60},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность лент на стандартном sqlite3 "
+        "и на yatube.sqlite при одновременных чтении и записи."
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--posts", type=int, default=200)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        database = settings.DATABASES["default"]
+        saved = dict(database)
+        # Ответы с ошибкой считаются, но в лог не пишутся.
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["testserver"],
+                CACHES={"default": {
+                    "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+                }},
+            ):
+                template = os.path.join(directory, "template.sqlite3")
+                self.configure(database, "django.db.backends.sqlite3",
+                               template, CONN_MAX_AGE=0)
+                urls = self.in_thread(self.prepare, options["posts"])
+                self.stdout.write(
+                    f"{'бэкенд':<28}{'чтений/с':>10}{'записей/с':>11}"
+                    f"{'ошибок':>8}"
+                )
+                for engine, config in CONFIGS.items():
+                    path = os.path.join(directory, f"{engine}.sqlite3")
+                    shutil.copy(template, path)
+                    self.configure(database, engine, path, **config)
+                    reads, writes, errors = self.run(urls, **options)
+                    seconds = options["seconds"]
+                    self.stdout.write(
+                        f"{engine:<28}{reads / seconds:>10.1f}"
+                        f"{writes / seconds:>11.1f}{errors:>8}"
+                    )
+        finally:
+            database.clear()
+            database.update(saved)
+            request_logger.setLevel(level)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def configure(database, engine, path, **extra):
+        # Соединения потоков создаются заново по этим настройкам.
+        database.update(ENGINE=engine, NAME=path, OPTIONS={}, **extra)
+
+    @staticmethod
+    def in_thread(target, *args):
+        result = []
+
+        def run():
+            try:
+                result.append(target(*args))
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    @staticmethod
+    def prepare(posts):
+        call_command("migrate", verbosity=0)
+        group = Group.objects.create(
+            title="Группа", slug="bench", description="Группа для замеров"
+        )
+        authors = [
+            User.objects.create(username=f"bench{i}") for i in range(5)
+        ]
+        for i in range(posts):
+            post = Post.objects.create(
+                text=f"Пост номер {i}",
+                author=authors[i % len(authors)],
+                group=group if i % 2 else None
+            )
+            Comment.objects.create(post=post, author=authors[0], text="Ок")
+        return [
+            reverse("index"),
+            reverse("index") + "?page=3",
+            reverse("group", args=[group.slug]),
+            reverse("profile", args=[authors[0].username]),
+            reverse("post", args=[post.author.username, post.id]),
+        ]
+
+    def run(self, urls, readers, writers, seconds, **options):
+        self.handler = WSGIHandler()
+        self.factory = RequestFactory()
+        self.urls = urls
+        self.deadline = time.monotonic() + seconds
+        self.counts = {"reads": 0, "writes": 0, "errors": 0}
+        self.lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.worker, args=(self.read,))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=self.worker, args=(self.write,))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return (
+            self.counts["reads"], self.counts["writes"], self.counts["errors"]
+        )
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    @staticmethod
+    def worker(target):
+        try:
+            target()
+        finally:
+            connections.close_all()
+
+    def read(self):
+        i = 0
+        while time.monotonic() < self.deadline:
+            url = self.urls[i % len(self.urls)]
+            status = []
+            response = self.handler(
+                self.factory.get(url).environ,
+                lambda code, headers: status.append(code)
+            )
+            b"".join(response)
+            response.close()
+            self.count("reads" if status[0].startswith("200") else "errors")
+            i += 1
+
+    def write(self):
+        author = User.objects.get(username="bench1")
+        while time.monotonic() < self.deadline:
+            # Как в обработчике запроса: соединение закрывается или
+            # переиспользуется по CONN_MAX_AGE.
+            close_old_connections()
+            try:
+                post = Post.objects.create(text="Новый пост", author=author)
+                Comment.objects.create(post=post, author=author, text="Ок")
+            except DatabaseError:
+                self.count("errors")
+            else:
+                self.count("writes")
+            close_old_connections()
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.loader import get_template
+
+# Прежняя навигация: ссылка на каждую страницу из page_range.
+FULL_RANGE_TEMPLATE = """
+<nav>
+    <ul class="pagination">
+        {% for i in page.paginator.page_range %}
+            {% if page.number == i %}
+            <li class="page-item active">
+                <span class="page-link">{{ i }}
+                    <span class="sr-only">(текущая)</span>
+                </span>
+            </li>
+            {% else %}
+                <li class="page-item">
+                    <a class="page-link" href="?page={{ i }}">{{ i }}</a>
+                </li>
+            {% endif %}
+        {% endfor %}
+    </ul>
+</nav>
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает отрисовку навигации по всем страницам и оконной "
+        "навигации includes/paginator.html."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=20000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        paginator = Paginator(range(options["pages"] * 10), 10)
+        page = paginator.page(options["pages"] // 2)
+        templates = {
+            "все страницы": engines["django"].from_string(
+                FULL_RANGE_TEMPLATE
+            ),
+            "окно": get_template("includes/paginator.html"),
+        }
+        self.stdout.write(f"{'навигация':<16}{'мс':>10}{'байт':>12}")
+        for name, template in templates.items():
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                html = template.render({"page": page})
+            elapsed = (time.perf_counter() - started) / options["repeat"]
+            self.stdout.write(
+                f"{name:<16}{elapsed * 1000:>10.2f}{len(html):>12}"
+            )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import comment_queue
+
+
+class Command(BaseCommand):
+    help = "Переносит комментарии из очереди записи в базу."
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            flushed = comment_queue.flush()
+            total += flushed
+            if flushed < settings.COMMENTS_FLUSH_BATCH:
+                break
+        self.stdout.write(self.style.SUCCESS(
+            f"Записано из очереди: {total}."
+        ))
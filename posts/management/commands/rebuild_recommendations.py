@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации авторов для всех пользователей."
+
+    def handle(self, *args, **options):
+        recommendations.rebuild()
+        self.stdout.write(self.style.SUCCESS("Рекомендации пересчитаны."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Заново строит поисковый индекс постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        get_backend().rebuild(connections[options["database"]])
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс построен."))
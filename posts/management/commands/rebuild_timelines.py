@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Заново раскладывает ленты подписок всех пользователей."
+
+    def handle(self, *args, **options):
+        users = timeline.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Ленты подписок разложены: пользователей {users}."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache, markup
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = "Готовит HTML текстов постов и комментариев, см. posts.markup."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Перерисовать все тексты, например после смены "
+                 "POSTS_MARKUP_FILTERS, а не только пустые."
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = markup.fill(Post, options["all"], options["batch_size"])
+        comments = markup.fill(
+            Comment, options["all"], options["batch_size"]
+        )
+        # Карточки постов хранят HTML текста, см. posts.cards.
+        feed_cache.bump("cards")
+        self.stdout.write(self.style.SUCCESS(
+            f"Тексты готовы: постов {posts}, комментариев {comments}."
+        ))
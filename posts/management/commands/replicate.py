@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.replicas import replicate
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в реплики из DATABASE_REPLICAS. "
+        "Заменяет репликацию при локальной разработке."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=None,
+            help="Повторять копирование каждые N секунд."
+        )
+        parser.add_argument(
+            "--database", action="append", dest="aliases",
+            help="Реплика для копирования; по умолчанию все."
+        )
+
+    def handle(self, *args, **options):
+        aliases = options["aliases"] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError("Реплики не заданы в DATABASE_REPLICAS.")
+        while True:
+            for alias in aliases:
+                replicate(alias)
+            if options["interval"] is None:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Реплики обновлены: {', '.join(aliases)}."
+        ))
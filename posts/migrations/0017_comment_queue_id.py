@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='queue_id',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='id в очереди'),
+        ),
+    ]
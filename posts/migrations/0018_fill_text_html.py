@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils.html import escape
+from django.utils.text import normalize_newlines
+
+
+def _render(text):
+    # Копия posts.markup.render без POSTS_MARKUP_FILTERS: миграция
+    # не зависит от кода приложения.
+    return escape(normalize_newlines(text)).replace('\n', '<br>')
+
+
+def fill_text_html(apps, schema_editor):
+    # HTML текстов, написанных до 0016_text_html; дальше он готовится
+    # при сохранении. С фильтрами разметки text_html остается пустым:
+    # шаблон выводит текст сам, пока его не подготовит render_texts.
+    if settings.POSTS_MARKUP_FILTERS:
+        return
+    for name in ('Post', 'Comment'):
+        model = apps.get_model('posts', name)
+        objects = model.objects.filter(text_html='').only(
+            'id', 'text'
+        ).order_by('id')
+        last = 0
+        # Порции по id, а не iterator(): SQLite может вернуть строку
+        # повторно, если таблицу обновляют при открытом курсоре чтения.
+        while True:
+            batch = list(objects.filter(id__gt=last)[:500])
+            if not batch:
+                break
+            for obj in batch:
+                obj.text_html = _render(obj.text)
+            model.objects.bulk_update(batch, ['text_html'])
+            last = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_comment_queue_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_text_html, migrations.RunPython.noop),
+    ]
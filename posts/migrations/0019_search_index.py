@@ -0,0 +1,68 @@
+from django.db import migrations
+
+NEW_TEXT = "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')"
+OLD_TEXT = "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')"
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """RunSQL только для SQLite: FTS5 в других базах нет, там поиск
+    работает через posts.search.LikeSearchBackend."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+
+class Migration(migrations.Migration):
+    # Индекс для posts.search.SQLiteFTSBackend. Раньше его создавал
+    # обработчик post_migrate, поэтому все создается с IF NOT EXISTS,
+    # а индекс заполняется заново.
+
+    dependencies = [
+        ('posts', '0018_fill_text_html'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+                "USING fts5(text, content='', "
+                "tokenize='unicode61 remove_diacritics 2')",
+                "CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert "
+                "AFTER INSERT ON posts_post BEGIN "
+                "INSERT INTO posts_post_fts(rowid, text) "
+                f"VALUES (new.id, {NEW_TEXT}); END",
+                "CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete "
+                "AFTER DELETE ON posts_post BEGIN "
+                "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+                f"VALUES ('delete', old.id, {OLD_TEXT}); END",
+                "CREATE TRIGGER IF NOT EXISTS posts_post_fts_update "
+                "AFTER UPDATE OF text ON posts_post BEGIN "
+                "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+                f"VALUES ('delete', old.id, {OLD_TEXT}); "
+                "INSERT INTO posts_post_fts(rowid, text) "
+                f"VALUES (new.id, {NEW_TEXT}); END",
+                "INSERT INTO posts_post_fts(posts_post_fts) "
+                "VALUES ('delete-all')",
+                "INSERT INTO posts_post_fts(rowid, text) "
+                "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+                "FROM posts_post",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+                "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+                "DROP TRIGGER IF EXISTS posts_post_fts_update",
+                "DROP TABLE IF EXISTS posts_post_fts",
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def fill_timelines(apps, schema_editor):
+    # Ленты подписок, появившихся до 0011_followfeedentry. Как
+    # posts.timeline.rebuild, но без кода приложения: посты каждого
+    # автора читаются один раз и раскладываются всем его подписчикам.
+    Follow = apps.get_model('posts', 'Follow')
+    FollowFeedEntry = apps.get_model('posts', 'FollowFeedEntry')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    heavy = UserStats.objects.filter(
+        followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT
+    ).values('user_id')
+    authors = Follow.objects.exclude(author_id__in=heavy).order_by(
+        'author_id'
+    ).values_list('author_id', flat=True).distinct()
+    for author_id in authors:
+        posts = list(
+            Post.objects.filter(author_id=author_id).values_list(
+                'id', 'pub_date'
+            )
+        )
+        if not posts:
+            continue
+        followers = Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        )
+        FollowFeedEntry.objects.bulk_create(
+            (
+                FollowFeedEntry(
+                    user_id=user_id, post_id=post_id, author_id=author_id,
+                    pub_date=pub_date
+                )
+                for user_id in followers.iterator()
+                for post_id, pub_date in posts
+            ),
+            batch_size=500,
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_fill_timelines'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='comment',
+            name='queue_id',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='queue_uid',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True, verbose_name='uid в очереди'),
+        ),
+    ]
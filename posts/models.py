@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.db.models.fields.related import ForeignKey
 
+from .storage import post_image_storage
+
 User = get_user_model()
 
 
@@ -25,11 +27,33 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для вывода в ленте вместе с автором и группой."""
+        return self.select_related("author", "group")
+
+    def update(self, **kwargs):
+        # text_html готовится в pre_save, а UPDATE мимо save() (update(),
+        # bulk_update) его не трогает. Если меняется только text, HTML
+        # стирается: шаблон выводит текст сам, пока команда render_texts
+        # не подготовит HTML заново.
+        if "text" in kwargs and "text_html" not in kwargs:
+            kwargs["text_html"] = ""
+        return super().update(**kwargs)
+
+
 class Post(models.Model):
     text = models.TextField(
         "текст публикации",
         help_text="Заполните текст поста"
     )
+    # Готовится при сохранении, см. posts.markup и PostQuerySet.update.
+    text_html = models.TextField(
+        "HTML текста",
+        blank=True,
+        default="",
+        editable=False
+    )
     pub_date = models.DateTimeField(
         "дата публикации",
         auto_now_add=True,
@@ -54,13 +78,37 @@ class Post(models.Model):
     image = models.ImageField(
         "картинка публикации",
         upload_to="posts/",
+        storage=post_image_storage,
         blank=True,
         null=True,
         help_text="Загрузите картинку"
     )
+    # Счетчик поддерживается сигналами, см. posts.counters.
+    comments_count = models.PositiveIntegerField(
+        "количество комментариев",
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
+        # Индексы повторяют порядок лент (-pub_date, -id), см. posts.paginator.
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="post_date_idx"
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx"
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -85,14 +133,39 @@ class Comment(models.Model):
         "Текст комментария",
         help_text="Заполните текст комментария"
     )
+    # Готовится при сохранении, см. posts.markup. Комментарии не
+    # редактируются, поэтому текст меняется только через save(); после
+    # правки мимо него HTML заново готовит render_texts --all.
+    text_html = models.TextField(
+        "HTML текста",
+        blank=True,
+        default="",
+        editable=False
+    )
     created = models.DateTimeField(
         "дата публикации",
         auto_now_add=True,
         help_text="Дата формируется автоматически"
     )
+    # uid записи в posts.comment_queue, из которой пришел комментарий:
+    # по нему повторная запись той же записи очереди пропускается.
+    queue_uid = models.CharField(
+        "uid в очереди",
+        max_length=32,
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["post", "-created", "-id"],
+                name="comment_post_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -121,3 +194,112 @@ class Follow(models.Model):
                 name="unique_subscriber"
             )
         ]
+        # unique_subscriber обслуживает подписки пользователя,
+        # этот индекс - подписчиков автора.
+        indexes = [
+            models.Index(
+                fields=["author", "user"],
+                name="follow_author_user_idx"
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, которые выводятся в карточке автора."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name="пользователь"
+    )
+    posts_count = models.PositiveIntegerField("записей", default=0)
+    followers_count = models.PositiveIntegerField("подписчиков", default=0)
+    following_count = models.PositiveIntegerField("подписок", default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FollowFeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="подписчик"
+    )
+    post = ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="пост"
+    )
+    # Автор и дата скопированы из поста, чтобы отписка и чтение ленты
+    # обходились без join с таблицей постов.
+    author = ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="автор"
+    )
+    pub_date = models.DateTimeField("дата публикации")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="feed_entry_user_date_idx"
+            ),
+            models.Index(
+                fields=["user", "author"],
+                name="feed_entry_user_author_idx"
+            ),
+        ]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в posts.storage.ContentAddressedStorage.
+
+    refcount — сколько постов ссылаются на файл, см. posts.blobs.
+    """
+    name = models.CharField("имя файла", max_length=255, unique=True)
+    refcount = models.PositiveIntegerField("ссылок", default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class AuthorRecommendation(models.Model):
+    """Автор, на которого пользователю стоит подписаться.
+
+    Заполняется posts.recommendations.
+    """
+    user = ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        verbose_name="пользователь"
+    )
+    author = ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="автор"
+    )
+    score = models.FloatField("оценка")
+
+    class Meta:
+        ordering = ["-score", "id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"],
+                name="unique_recommendation"
+            )
+        ]
@@ -0,0 +1,210 @@
+import hashlib
+import re
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from yatube.replicas import reading_replicas
+
+from .comment_queue import pending_comments
+from .feed_cache import generations
+from .follow_graph import is_following
+from .forms import CommentForm
+from .models import Post
+from .recommendations import who_to_follow
+
+# Метка дырки в общей странице. Пользовательский текст в шаблонах
+# экранируется, поэтому подделать «<!--» в нем нельзя, а в аргументах
+# после urlencode не бывает «>».
+HOLE = re.compile(r"<!--hole:(\w+):([^>]*)-->")
+
+
+def _nav(request):
+    return {}
+
+
+def _menu(request, **tabs):
+    if not request.user.is_authenticated:
+        return None
+    return tabs
+
+
+def _follow_button(request, author_id, username):
+    author_id = int(author_id)
+    if request.user.pk == author_id:
+        return None
+    return {
+        "username": username,
+        "following": is_following(request.user, author_id),
+    }
+
+
+def _comment_form(request, username, post_id):
+    if not request.user.is_authenticated:
+        return None
+    post_id = int(post_id)
+    return {
+        "username": username,
+        "post_id": post_id,
+        "form": CommentForm(),
+        "pending_comments": (
+            pending_comments(Post(pk=post_id), request.user)
+            if settings.COMMENTS_WRITE_BEHIND else []
+        ),
+    }
+
+
+def _edit_link(request, author_id, username, post_id):
+    if request.user.pk != int(author_id):
+        return None
+    return {"username": username, "post_id": post_id}
+
+
+def _who_to_follow(request):
+    recommendations = who_to_follow(request.user)
+    if not recommendations:
+        return None
+    return {"recommendations": recommendations}
+
+
+# Части страницы, которые зависят от зрителя: шаблон и функция, которая
+# по запросу и аргументам из метки готовит его контекст. None вместо
+# контекста — для этого зрителя дырка пустая.
+HOLES = {
+    "nav": ("includes/nav.html", _nav),
+    "menu": ("includes/menu.html", _menu),
+    "follow_button": ("includes/follow_button.html", _follow_button),
+    "comment_form": ("includes/comment_form.html", _comment_form),
+    "edit_link": ("includes/edit_link.html", _edit_link),
+    "who_to_follow": ("includes/who_to_follow.html", _who_to_follow),
+}
+
+
+def punching(request):
+    """Рисуется ли сейчас общая страница с метками вместо дырок."""
+    return getattr(request, "page_holes", False)
+
+
+def render_hole(request, name, arguments):
+    template, get_context = HOLES[name]
+    context = get_context(request, **arguments)
+    if context is None:
+        return ""
+    return render_to_string(template, context, request=request)
+
+
+def mark(name, arguments):
+    return "<!--hole:{}:{}-->".format(
+        name, urlencode(sorted(arguments.items()))
+    )
+
+
+def hole(request, name, arguments):
+    """Дырка для шаблона: метка в общей странице, иначе сам фрагмент."""
+    if request is None or not punching(request):
+        return render_hole(request, name, arguments)
+    return mark(name, arguments)
+
+
+def fill(request, html):
+    """Подставляет в общую страницу фрагменты для зрителя запроса."""
+    return HOLE.sub(
+        lambda match: render_hole(
+            request, match.group(1), dict(parse_qsl(match.group(2)))
+        ),
+        html
+    )
+
+
+@contextmanager
+def _anonymous(request):
+    viewer = request.user
+    request.user = AnonymousUser()
+    try:
+        yield
+    finally:
+        request.user = viewer
+
+
+def _render_shared(view, request, args, kwargs):
+    request.page_holes = True
+    try:
+        with _anonymous(request):
+            response = view(request, *args, **kwargs)
+    finally:
+        del request.page_holes
+    return response
+
+
+def _shared(view, request, key, args, kwargs):
+    """Общая страница из кэша или ответ view, если кэшировать нечего."""
+    page = cache.get(key)
+    if page is not None:
+        return page, None
+    response = _render_shared(view, request, args, kwargs)
+    html = response.content.decode(response.charset)
+    if response.status_code != 200:
+        # Ошибки и перенаправления не кэшируются.
+        response.content = fill(request, html)
+        return None, response
+    if not reading_replicas():
+        cache.set(key, html, settings.PAGE_CACHE_TIMEOUT)
+    return html, None
+
+
+def _anonymous_page(view, request, key, args, kwargs):
+    page = cache.get(f"{key}:anonymous")
+    if page is not None:
+        return page, None
+    page, response = _shared(view, request, key, args, kwargs)
+    if page is not None:
+        page = fill(request, page)
+        if not reading_replicas():
+            cache.set(f"{key}:anonymous", page, settings.PAGE_CACHE_TIMEOUT)
+    return page, response
+
+
+def _page_key(view, request, scopes):
+    parts = [view.__name__, request.path, request.GET.urlencode()]
+    parts.extend(generations(*scopes))
+    return "page:" + hashlib.md5(
+        ":".join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def shared_page(scopes_func):
+    """Кэширует страницу целиком, общую для всех зрителей.
+
+    Страница рисуется как для анонима, а части из HOLES остаются в ней
+    метками. Ключ — view, путь и параметры запроса и поколения областей,
+    которые возвращает scopes_func (см. posts.etags), поэтому страница
+    устаревает вместе с лентами. Аноним получает отдельно закэшированную
+    заполненную копию, то есть одно чтение из кэша без view и шаблонов.
+    Остальным в общую страницу подставляются фрагменты, нарисованные
+    под них.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            scopes = scopes_func(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = _page_key(view, request, scopes)
+            if request.user.is_authenticated:
+                page, response = _shared(view, request, key, args, kwargs)
+                if page is not None:
+                    page = fill(request, page)
+            else:
+                page, response = _anonymous_page(
+                    view, request, key, args, kwargs
+                )
+            return response or HttpResponse(page)
+        return wrapper
+    return decorator
@@ -0,0 +1,177 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from . import follow_graph
+from .models import AuthorRecommendation, Follow, UserStats
+
+User = get_user_model()
+
+
+def _key(user_id):
+    return f"recommendations:{user_id}"
+
+
+def score(user_id, following, followers):
+    """Оценки авторов для пользователя по графу подписок.
+
+    following — на кого подписан каждый пользователь, followers — кто
+    подписан на каждого автора; в них должны быть хотя бы подписки
+    самого пользователя, его авторов и тех, кто подписан на них же.
+
+    Автор получает RECOMMENDATIONS_FOF_WEIGHT за каждого автора
+    пользователя, который на него подписан (друг друга), и сходство
+    Жаккара по подпискам с каждым, кто на него подписан (совместные
+    подписки).
+    """
+    mine = following.get(user_id, set())
+    scores = Counter()
+    for friend in mine:
+        for author in following.get(friend, ()):
+            scores[author] += settings.RECOMMENDATIONS_FOF_WEIGHT
+    shared = Counter(
+        other
+        for author in mine
+        for other in followers.get(author, ())
+        if other != user_id
+    )
+    for other, common in shared.items():
+        theirs = following.get(other, set())
+        similarity = common / (len(mine) + len(theirs) - common)
+        for author in theirs:
+            scores[author] += similarity
+    for author in mine | {user_id}:
+        scores.pop(author, None)
+    return scores
+
+
+def _popular(exclude, limit):
+    # Тем, у кого нет подписок, советуются самые популярные авторы.
+    return UserStats.objects.exclude(user_id__in=exclude).filter(
+        followers_count__gt=0
+    ).order_by("-followers_count").values_list(
+        "user_id", flat=True
+    )[:limit]
+
+
+def _store(user_id, scores, mine):
+    size = settings.RECOMMENDATIONS_SIZE
+    best = scores.most_common(size)
+    if len(best) < size:
+        taken = {author for author, _ in best}
+        exclude = taken | mine | {user_id}
+        # Популярные авторы идут после найденных по графу.
+        best += [
+            (author, 0) for author in _popular(exclude, size - len(best))
+        ]
+    with transaction.atomic():
+        AuthorRecommendation.objects.filter(user_id=user_id).delete()
+        AuthorRecommendation.objects.bulk_create(
+            AuthorRecommendation(user_id=user_id, author_id=author, score=s)
+            for author, s in best
+        )
+    _load(user_id)
+
+
+def _load(user_id):
+    result = [
+        (recommendation.author.username,
+         recommendation.author.get_full_name())
+        for recommendation in AuthorRecommendation.objects.filter(
+            user_id=user_id
+        ).select_related("author")
+    ]
+    cache.set(_key(user_id), result, None)
+    return result
+
+
+def _sample(stats, limit):
+    return list(stats.values_list("user_id", flat=True)[:limit])
+
+
+def refresh(user_id):
+    """Пересчитывает рекомендации одного пользователя после подписки.
+
+    Загружается только выборка из окрестности пользователя в графе
+    подписок: до RECOMMENDATIONS_SAMPLE_SIZE его авторов, которые сами
+    подписаны не больше чем на столько авторов (для друзей друзей),
+    столько же авторов с не большим числом подписчиков и столько же их
+    подписчиков (для совместных подписок). Популярные авторы
+    пропускаются, поэтому подписка на них не читает весь граф. Полный
+    пересчет делает rebuild.
+    """
+    limit = settings.RECOMMENDATIONS_SAMPLE_SIZE
+    mine = follow_graph.followees(user_id)
+    stats = UserStats.objects.filter(
+        user_id__in=Follow.objects.filter(user_id=user_id).values(
+            "author_id"
+        )
+    )
+    friends = _sample(stats.filter(following_count__lte=limit), limit)
+    authors = set(_sample(stats.filter(followers_count__lte=limit), limit))
+    others = set(_sample(
+        UserStats.objects.filter(
+            user_id__in=Follow.objects.filter(
+                author_id__in=authors
+            ).values("user_id"),
+            following_count__lte=limit
+        ).exclude(user_id=user_id),
+        limit
+    ))
+    following = defaultdict(set, {user_id: set(mine)})
+    followers = defaultdict(set)
+    for user, author in Follow.objects.filter(
+        user_id__in=others.union(friends)
+    ).values_list("user_id", "author_id"):
+        following[user].add(author)
+        if user in others and author in authors:
+            followers[author].add(user)
+    _store(user_id, score(user_id, following, followers), mine)
+
+
+def refresh_on_commit(user_id):
+    """refresh после коммита, если пользователь еще существует.
+
+    Для отписок: при удалении пользователя или автора его подписки
+    удаляются каскадом раньше него самого, и сразу записанные
+    рекомендации ссылались бы на удаляемые строки.
+    """
+    def run():
+        if User.objects.filter(pk=user_id).exists():
+            refresh(user_id)
+    transaction.on_commit(run)
+
+
+def rebuild():
+    """Пересчитывает рекомендации всех пользователей по всему графу.
+
+    Граф читается одним запросом, дальше база нужна только для записи.
+    """
+    following = defaultdict(set)
+    followers = defaultdict(set)
+    for user, author in Follow.objects.values_list(
+        "user_id", "author_id"
+    ).iterator():
+        following[user].add(author)
+        followers[author].add(user)
+    for user_id in UserStats.objects.values_list("user_id", flat=True):
+        _store(
+            user_id, score(user_id, following, followers),
+            following.get(user_id, set())
+        )
+
+
+def who_to_follow(user):
+    """Рекомендации пользователя: (username, полное имя) по убыванию оценки.
+
+    Обычно это одно чтение из кэша.
+    """
+    if not user.is_authenticated:
+        return []
+    result = cache.get(_key(user.pk))
+    if result is None:
+        result = _load(user.pk)
+    return result
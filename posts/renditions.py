@@ -0,0 +1,261 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+
+from . import feed_cache
+from .uploads import sanitize
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд помнить, что миниатюр еще нет, прежде чем снова
+# проверять хранилище.
+MISSING_TIMEOUT = 60
+
+EXTENSIONS = {
+    "JPEG": "jpg",
+    "PNG": "png",
+    "GIF": "gif",
+    "WEBP": "webp",
+    "AVIF": "avif",
+}
+MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "AVIF": "image/avif",
+}
+
+Variant = namedtuple("Variant", "name width format geometry options")
+
+_executor = None
+
+
+class Picture:
+    """Готовые варианты одной миниатюры для <picture>.
+
+    sources — пары (MIME-тип, srcset) для современных форматов,
+    src и srcset — запасной формат для <img>.
+    """
+
+    def __init__(self, variants):
+        self.width = max(variant.width for variant in variants)
+        by_format = {}
+        for variant in variants:
+            by_format.setdefault(variant.format, []).append(variant)
+        *preferred, fallback = by_format
+        self.sources = [
+            (MIME_TYPES[fmt], self._srcset(by_format[fmt]))
+            for fmt in preferred
+        ]
+        self.srcset = self._srcset(by_format[fallback])
+        self.src = default.storage.url(by_format[fallback][-1].name)
+
+    @staticmethod
+    def _srcset(variants):
+        return ", ".join(
+            f"{default.storage.url(variant.name)} {variant.width}w"
+            for variant in variants
+        )
+
+
+def available_formats():
+    """Форматы из настроек, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [
+        fmt for fmt in settings.POST_IMAGE_FORMATS if fmt in Image.SAVE
+    ]
+
+
+def _size(geometry):
+    width, height = geometry.split("x")
+    return int(width), int(height)
+
+
+def _options(options):
+    # Те же значения по умолчанию, что подставляет sorl.thumbnail.
+    options = dict(options)
+    for key, value in default.backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in default.backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(thumbnail_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def _variant_name(source, geometry, options):
+    # Раскладка файлов как у sorl.thumbnail, но с расширениями для WebP
+    # и AVIF.
+    key = tokey(source.key, geometry, serialize(options))
+    return "{}{}/{}/{}.{}".format(
+        thumbnail_settings.THUMBNAIL_PREFIX, key[:2], key[2:4], key,
+        EXTENSIONS[options["format"]]
+    )
+
+
+class RenditionBackend(ThumbnailBackend):
+    """Бэкенд sorl.thumbnail (THUMBNAIL_BACKEND) с именами файлов как
+    у variants, в том числе для AVIF, которого sorl не знает."""
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        return _variant_name(source, geometry_string, options)
+
+
+def variants(image_name, rendition):
+    """Все файлы миниатюры: каждая ширина в каждом доступном формате.
+
+    Форматы идут в порядке предпочтения, ширины — по возрастанию.
+    """
+    geometry, options = settings.POST_IMAGE_RENDITIONS[rendition]
+    width, height = _size(geometry)
+    widths = sorted(
+        {size for size in settings.POST_IMAGE_WIDTHS if size < width}
+        | {width}
+    )
+    source = ImageFile(image_name)
+    result = []
+    for fmt in available_formats():
+        fmt_options = _options({
+            **options, **settings.POST_IMAGE_FORMATS[fmt], "format": fmt
+        })
+        for size in widths:
+            size_geometry = f"{size}x{round(height * size / width)}"
+            result.append(Variant(
+                _variant_name(source, size_geometry, fmt_options),
+                size, fmt, size_geometry, fmt_options
+            ))
+    return result
+
+
+def _ready_key(variants):
+    # Ключ меняется вместе с набором файлов, поэтому новые ширины или
+    # форматы в настройках не выдаются за готовые.
+    return "rendition:" + tokey(*(variant.name for variant in variants))
+
+
+def _ready(families):
+    """Отбирает из families наборы вариантов, которые уже в хранилище."""
+    keys = {_ready_key(family): family for family in families if family}
+    found = cache.get_many(keys)
+    checked = {
+        key: all(default.storage.exists(variant.name) for variant in family)
+        for key, family in keys.items() if key not in found
+    }
+    cache.set_many(
+        {key: True for key, ready in checked.items() if ready}, None
+    )
+    cache.set_many(
+        {key: False for key, ready in checked.items() if not ready},
+        MISSING_TIMEOUT
+    )
+    found.update(checked)
+    return {key for key, ready in found.items() if ready}
+
+
+def picture(image_name, rendition):
+    """Готовая миниатюра Picture или None, если она еще не создана.
+
+    Картинка при этом не открывается и не пережимается: проверяется
+    только кэш, а при промахе — наличие файлов в хранилище.
+    """
+    if not image_name:
+        return None
+    family = variants(image_name, rendition)
+    if _ready_key(family) not in _ready([family]):
+        return None
+    return Picture(family)
+
+
+def resolve(posts, *renditions):
+    """Подставляет постам готовые миниатюры в post.pictures.
+
+    Для всей страницы ленты делается одно чтение из кэша вместо
+    отдельного запроса на каждую картинку.
+    """
+    renditions = renditions or tuple(settings.POST_IMAGE_RENDITIONS)
+    wanted = []
+    for post in posts:
+        post.pictures = {}
+        if post.image:
+            wanted.extend(
+                (post, rendition, variants(post.image.name, rendition))
+                for rendition in renditions
+            )
+    ready = _ready(family for _, _, family in wanted)
+    for post, rendition, family in wanted:
+        if _ready_key(family) in ready:
+            post.pictures[rendition] = Picture(family)
+    return posts
+
+
+def generate(image_name):
+    """Создает все варианты миниатюр картинки, которых еще нет."""
+    for rendition in settings.POST_IMAGE_RENDITIONS:
+        family = variants(image_name, rendition)
+        for variant in family:
+            # Имя файла считает RenditionBackend, поэтому get_thumbnail
+            # пишет ровно variant.name, а готовые варианты пропускает.
+            get_thumbnail(image_name, variant.geometry, **variant.options)
+        cache.set(_ready_key(family), True, None)
+
+
+def delete(image_name):
+    """Удаляет все варианты миниатюр картинки."""
+    for rendition in settings.POST_IMAGE_RENDITIONS:
+        family = variants(image_name, rendition)
+        for variant in family:
+            default.storage.delete(variant.name)
+        cache.delete(_ready_key(family))
+
+
+def _executor_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POST_IMAGE_WORKERS,
+            thread_name_prefix="renditions"
+        )
+    return _executor
+
+
+def _run(image_name, scopes):
+    try:
+        sanitize(image_name)
+        generate(image_name)
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюры %s", image_name)
+        return
+    # Ленты с заглушкой вместо картинки больше не актуальны.
+    feed_cache.bump(*scopes)
+
+
+def _submit(image_name, scopes):
+    if settings.POST_IMAGE_ASYNC:
+        _executor_pool().submit(_run, image_name, scopes)
+    else:
+        _run(image_name, scopes)
+
+
+def schedule(post):
+    """Ставит обработку новой картинки поста в очередь после коммита.
+
+    Картинка очищается от метаданных, затем готовятся миниатюры.
+    Рабочим потокам не нужна база: имя картинки и области лент
+    передаются им готовыми.
+    """
+    if not post.image:
+        return
+    image_name = post.image.name
+    scopes = feed_cache.post_scopes(post.author_id, post.group_id, post.pk)
+    transaction.on_commit(lambda: _submit(image_name, scopes))
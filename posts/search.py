@@ -0,0 +1,221 @@
+import math
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .paginator import CursorPage, MAX_PK
+
+WORD_RE = re.compile(r"\w+")
+# Окончания, которые отбрасываются перед поиском по префиксу:
+# "котики" ищется как "котик*" и находит "котик", "котиками" и т.д.
+RUSSIAN_ENDINGS = sorted(
+    (
+        "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими",
+        "ешь", "ете", "ишь", "ите", "ают", "яют", "ует", "ют", "ут", "ат",
+        "ят", "ых", "их", "ая", "яя", "ое", "ее", "ой", "ей", "ий", "ый",
+        "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ую", "юю", "ия",
+        "ие", "ть", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+    ),
+    key=len,
+    reverse=True
+)
+MIN_STEM_LENGTH = 3
+
+
+def normalize(text):
+    return text.lower().replace("ё", "е")
+
+
+def stem(word):
+    for ending in RUSSIAN_ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def terms(query):
+    return [stem(word) for word in WORD_RE.findall(normalize(query))]
+
+
+class SearchBackend:
+    """Интерфейс поискового бэкенда постов."""
+
+    def rebuild(self, connection):
+        """Заново строит индекс по всем постам."""
+
+    def install(self, connection):
+        """Восстанавливает то, что индексу нужно в базе, после migrate."""
+
+    def search(self, query, after=None, limit=None):
+        """Возвращает список пар (id поста, курсор) в порядке
+        релевантности, начиная после курсора after.
+        """
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, query):
+        """Оставляет в queryset только посты, подходящие под запрос."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Поиск по виртуальной таблице SQLite FTS5.
+
+    Индекс хранит нормализованный текст постов и обновляется триггерами
+    на posts_post, поэтому ловит и bulk_create, и update(). Таблицу
+    и триггеры создает миграция 0019_search_index. SQLite удаляет
+    триггеры, когда миграция пересоздает posts_post, поэтому после
+    каждого migrate install создает недостающие триггеры заново.
+    """
+
+    table = "posts_post_fts"
+
+    @staticmethod
+    def normalized(column):
+        return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+    def rebuild(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table}({self.table}) VALUES ('delete-all')"
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table}(rowid, text) "
+                f"SELECT id, {self.normalized('text')} FROM posts_post"
+            )
+
+    def triggers(self):
+        insert = (
+            f"INSERT INTO {self.table}(rowid, text) "
+            f"VALUES (new.id, {self.normalized('new.text')});"
+        )
+        delete = (
+            f"INSERT INTO {self.table}({self.table}, rowid, text) "
+            f"VALUES ('delete', old.id, {self.normalized('old.text')});"
+        )
+        return {
+            f"{self.table}_insert":
+                f"AFTER INSERT ON posts_post BEGIN {insert} END",
+            f"{self.table}_delete":
+                f"AFTER DELETE ON posts_post BEGIN {delete} END",
+            f"{self.table}_update":
+                f"AFTER UPDATE OF text ON posts_post "
+                f"BEGIN {delete} {insert} END",
+        }
+
+    def install(self, connection):
+        if connection.vendor != "sqlite":
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master")
+            existing = {name for name, in cursor.fetchall()}
+            triggers = self.triggers()
+            # Таблицы нет, если миграции откатили до 0019.
+            if self.table not in existing or existing.issuperset(triggers):
+                return
+            for name, body in triggers.items():
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        # Пока триггеров не было, изменения постов в индекс не попадали.
+        self.rebuild(connection)
+
+    def match(self, query):
+        return " ".join(f'"{term}"*' for term in terms(query))
+
+    def search(self, query, after=None, limit=None):
+        match = self.match(query)
+        if not match:
+            return []
+        sql = (
+            f"SELECT rowid, rank FROM {self.table} "
+            f"WHERE {self.table} MATCH %s"
+        )
+        params = [match]
+        cursor_value = self.decode_cursor(after)
+        if cursor_value is not None:
+            sql += " AND (rank > %s OR (rank = %s AND rowid > %s))"
+            params.extend(
+                [cursor_value[0], cursor_value[0], cursor_value[1]]
+            )
+        sql += " ORDER BY rank, rowid"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                (post_id, f"{rank!r}_{post_id}")
+                for post_id, rank in cursor.fetchall()
+            ]
+
+    @staticmethod
+    def decode_cursor(value):
+        # Подделанный курсор считается отсутствующим: слишком большой id
+        # не помещается в целое SQLite, а nan и inf не сравниваются с rank.
+        try:
+            rank, post_id = (value or "").split("_")
+            rank, post_id = float(rank), int(post_id)
+        except ValueError:
+            return None
+        if not math.isfinite(rank) or not 0 <= post_id <= MAX_PK:
+            return None
+        return rank, post_id
+
+    def filter_queryset(self, queryset, query):
+        match = self.match(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s",
+            [match]
+        ))
+
+
+class LikeSearchBackend(SearchBackend):
+    """Запасной поиск через LIKE для баз без полнотекстового индекса."""
+
+    def filter_queryset(self, queryset, query):
+        words = WORD_RE.findall(query)
+        if not words:
+            return queryset.none()
+        condition = Q()
+        for word in words:
+            condition &= Q(text__icontains=stem(word.lower()))
+        return queryset.filter(condition)
+
+    def search(self, query, after=None, limit=None):
+        posts = self.filter_queryset(Post.objects.all(), query).order_by("-pk")
+        if after is not None and after.isdigit():
+            posts = posts.filter(pk__lt=int(after))
+        if limit is not None:
+            posts = posts[:limit]
+        return [
+            (post_id, str(post_id))
+            for post_id in posts.values_list("pk", flat=True)
+        ]
+
+
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+def search_page(query, after=None):
+    """Страница результатов поиска, открытая по курсору after."""
+    per_page = settings.POSTS_PER_PAGE
+    results = get_backend().search(query, after=after, limit=per_page + 1)
+    has_next = len(results) > per_page
+    results = results[:per_page]
+    posts = Post.objects.for_feed().in_bulk(
+        [post_id for post_id, _ in results]
+    )
+    return CursorPage(
+        [posts[post_id] for post_id, _ in results if post_id in posts],
+        None,
+        next_cursor=results[-1][1] if has_next else None,
+    )
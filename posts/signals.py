@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    blobs, counters, feed_cache, follow_graph, markup, recommendations,
+    search, timeline, trending
+)
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        # Под этим id мог быть удаленный пользователь со своими подписками.
+        follow_graph.forget(instance.pk)
+
+
+# posts.etags помнит id по username, slug и автору поста: при
+# переименовании и удалении эти id сбрасываются все сразу.
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_renamed(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or "username" in update_fields):
+        # Имя автора есть во всех его карточках постов.
+        feed_cache.bump("ids", "cards")
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def lookup_deleted(sender, instance, **kwargs):
+    feed_cache.bump("ids")
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Посты группы остаются без нее через UPDATE без сигналов, а ссылка
+    # на группу есть в их карточках и в общих лентах.
+    feed_cache.bump("ids", "cards", "posts", f"group:{instance.pk}")
+
+
+def database_reset(sender, **kwargs):
+    # После migrate и flush под теми же slug и username другие строки.
+    feed_cache.bump("ids")
+
+
+def search_installed(sender, using, **kwargs):
+    # Миграция, пересоздающая posts_post, молча удаляет триггеры индекса.
+    search.get_backend().install(connections[using])
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(f"group:{instance.pk}", "ids")
+    if not created:
+        # Название группы есть в карточках ее постов.
+        feed_cache.bump("cards")
+
+
+# HTML текста готовится один раз при записи, а не при каждом показе.
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def text_saving(sender, instance, update_fields, **kwargs):
+    if update_fields is None or "text" in update_fields:
+        instance.text_html = markup.render(instance.text)
+
+
+# При редактировании пост мог уйти из прежней группы или сменить
+# картинку.
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    instance._saved_image = None
+    if instance.pk is not None:
+        feed_cache.bump_post(instance.pk)
+        instance._saved_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list("image", flat=True).first()
+
+
+# Новый пост попадает в ленты подписчиков автора.
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(
+        *feed_cache.post_scopes(
+            instance.author_id, instance.group_id, instance.pk
+        )
+    )
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+        trending.record_post(instance)
+    saved_image = getattr(instance, "_saved_image", None)
+    if instance.image.name != saved_image:
+        blobs.acquire(instance.image.name)
+        blobs.release(saved_image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    trending.forget_post(instance.pk)
+    feed_cache.bump(
+        *feed_cache.post_scopes(
+            instance.author_id, instance.group_id, instance.pk
+        ),
+        "ids"
+    )
+    blobs.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, comments_count=1)
+        feed_cache.bump_post(instance.post_id)
+        trending.record_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, comments_count=-1)
+    feed_cache.bump_post(instance.post_id)
+
+
+# Подписка добавляет в ленту посты автора, отписка убирает их. Счетчики
+# подписок выводятся на страницах профиля и поста обоих пользователей.
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, followers_count=1)
+        counters.bump_user(instance.user_id, following_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        feed_cache.bump(
+            f"follow:{instance.user_id}", f"author:{instance.user_id}",
+            f"author:{instance.author_id}"
+        )
+        follow_graph.refresh(instance.user_id)
+        recommendations.refresh(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, followers_count=-1)
+    counters.bump_user(instance.user_id, following_count=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.refill(instance.author_id)
+    feed_cache.bump(
+        f"follow:{instance.user_id}", f"author:{instance.user_id}",
+        f"author:{instance.author_id}"
+    )
+    follow_graph.refresh(instance.user_id)
+    recommendations.refresh_on_commit(instance.user_id)
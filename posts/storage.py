@@ -0,0 +1,70 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_RE = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+def file_digest(content):
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором одинаковые файлы лежат в одном экземпляре.
+
+    Файл сохраняется под SHA-256 загруженного содержимого:
+    ``posts/ab/cd/abcd….jpg``. Повторная загрузка той же картинки ничего
+    не пишет и возвращает существующее имя, поэтому и миниатюры у таких
+    постов общие. Удаляются файлы по счетчику ссылок, см. posts.blobs.
+    """
+
+    def digest_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+
+    def is_blob(self, name):
+        return BLOB_RE.search(name or "") is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        # ImageUploadHandler считает хеш, пока принимает файл.
+        digest = getattr(content, "content_digest", None)
+        name = self.digest_name(name, digest or file_digest(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def overwrite(self, name, content):
+        """Атомарно заменяет содержимое файла, не меняя его имени."""
+        path = self.path(name)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, "wb") as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+post_image_storage = ContentAddressedStorage()
@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.page_cache import hole as page_hole, mark
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **arguments):
+    """Часть страницы, которая зависит от зрителя, см. posts.page_cache."""
+    # Фрагменты, общие для всех зрителей, всегда оставляют метку.
+    if context.get("punch_holes"):
+        return mark_safe(mark(name, arguments))
+    return mark_safe(page_hole(context.get("request"), name, arguments))
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.paginator import page_window as window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page):
+    """Номера страниц для includes/paginator.html, None — пропуск."""
+    return list(window(page))
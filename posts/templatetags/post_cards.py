@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_cards
+from posts.page_cache import fill, punching
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов из кэша, см. posts.cards."""
+    html = render_cards(posts)
+    request = context["request"]
+    if not punching(request):
+        # В общей странице метки заполнит posts.page_cache.
+        html = fill(request, html)
+    return mark_safe(html)
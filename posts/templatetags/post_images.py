@@ -0,0 +1,24 @@
+from django import template
+from django.conf import settings
+
+from posts.renditions import picture
+
+register = template.Library()
+
+
+@register.inclusion_tag("includes/post_image.html")
+def post_image(post, rendition="card"):
+    """Готовая миниатюра картинки поста или заглушка того же размера."""
+    # Карточки лент получают миниатюры заранее, см. posts.cards.
+    pictures = getattr(post, "pictures", None)
+    if pictures is None:
+        ready = picture(post.image.name, rendition)
+    else:
+        ready = pictures.get(rendition)
+    geometry, _ = settings.POST_IMAGE_RENDITIONS[rendition]
+    width, height = (int(side) for side in geometry.split("x"))
+    return {
+        "post": post,
+        "picture": ready,
+        "ratio": round(height * 100 / width, 2),
+    }
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cards import render_cards
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostCardsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="Reader")
+        self.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="slug-test",
+            description="Описание тестовой группы"
+        )
+        self.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author,
+            group=self.group
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def cards(self):
+        return render_cards(Post.objects.for_feed().filter(pk=self.post.pk))
+
+    def test_card_shared_between_feeds(self):
+        self.client.get(reverse("index"))
+        response = self.client.get(reverse("group", args=[self.group.slug]))
+        self.assertTemplateNotUsed(response, "includes/post_item.html")
+        self.assertContains(response, "Тестовый текст поста")
+
+    def test_card_version_bumped(self):
+        """Карточка рисуется заново после правки, комментария и
+        переименования группы."""
+        self.cards()
+        self.post.text = "Новый текст"
+        self.post.save()
+        self.assertIn("Новый текст", self.cards())
+
+        Comment.objects.create(post=self.post, author=self.user, text="Ок")
+        self.assertIn("Комментариев: 1", self.cards())
+
+        self.group.title = "Новое название"
+        self.group.save()
+        self.assertIn("#Новое название", self.cards())
+
+    def test_group_delete_updates_feeds(self):
+        """После удаления группы карточки и ленты ее не показывают."""
+        self.cards()
+        self.client.get(reverse("index"))
+        self.group.delete()
+        self.assertNotIn("#Тестовая группа", self.cards())
+        self.assertNotContains(
+            self.client.get(reverse("index")), "#Тестовая группа"
+        )
+
+    def test_unchanged_card_not_rendered(self):
+        self.cards()
+        with self.assertTemplateNotUsed("includes/post_item.html"):
+            with self.assertNumQueries(1):
+                self.assertIn("Тестовый текст поста", self.cards())
+
+    def test_edit_link_per_viewer(self):
+        """Общая карточка, а «Редактировать» — только автору."""
+        Follow.objects.create(user=self.user, author=self.author)
+        edit_url = reverse(
+            "post_edit", args=[self.author.username, self.post.pk]
+        )
+        for url in (
+            reverse("index"),
+            reverse("follow_index"),
+            reverse("search") + "?q=Тестовый",
+        ):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "Тестовый текст поста")
+                self.assertNotContains(response, edit_url)
+                self.assertNotContains(response, "<!--hole:")
+        for url in (reverse("index"), reverse("search") + "?q=Тестовый"):
+            with self.subTest(url=url):
+                self.assertContains(self.author_client.get(url), edit_url)
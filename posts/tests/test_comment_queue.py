@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, override_settings, TestCase
+from django.urls import reverse
+
+from posts import comment_queue
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+QUEUE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    COMMENTS_WRITE_BEHIND=True,
+    COMMENTS_QUEUE_PATH=os.path.join(QUEUE_DIR, "queue.sqlite3"),
+    COMMENTS_FLUSH_INTERVAL=None
+)
+class CommentWriteBehindTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(QUEUE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="TestUser")
+        self.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author
+        )
+        self.client.force_login(self.user)
+        self.post_url = reverse("post", args=[self.author, self.post.id])
+        self.addCleanup(self.clear_queue)
+
+    def clear_queue(self):
+        queue = comment_queue.get_queue()
+        queue.done([item.id for item in queue.batch(1000)])
+
+    def comment(self, text="Отложенный комментарий"):
+        self.client.post(
+            reverse("add_comment", args=[self.author, self.post.id]),
+            data={"text": text}
+        )
+
+    def test_author_sees_pending_comment(self):
+        """Комментарий из очереди сразу виден автору, но не другим."""
+        self.comment()
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(
+            self.client.get(self.post_url), "Отложенный комментарий"
+        )
+        self.assertNotContains(
+            Client().get(self.post_url), "Отложенный комментарий"
+        )
+
+    def test_flush_writes_batch(self):
+        """Очередь переносится в базу вместе со счетчиком комментариев."""
+        self.comment("Первый")
+        self.comment("Второй")
+        self.assertEqual(comment_queue.flush(), 2)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(
+            set(Comment.objects.values_list("text", flat=True)),
+            {"Первый", "Второй"}
+        )
+        response = self.client.get(self.post_url)
+        self.assertEqual(response.context["pending_comments"], [])
+        self.assertContains(response, "Первый", count=1)
+
+    def test_flush_keeps_queue_time_and_repeats(self):
+        """Комментарий получает время постановки в очередь, а одинаковые
+        комментарии в одной порции не теряются."""
+        self.comment("+1")
+        self.comment("+1")
+        queued = comment_queue.get_queue().batch(10)
+        comment_queue.flush()
+        self.assertEqual(
+            list(Comment.objects.order_by("id").values_list(
+                "queue_uid", "created"
+            )),
+            [(item.uid, item.created) for item in queued]
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+    def test_flush_skips_written_and_deleted(self):
+        """Повтор после сбоя не дублирует комментарии, а комментарии
+        к удаленным постам пропускаются."""
+        self.comment("Первый")
+        queue = comment_queue.get_queue()
+        # Процесс "упал" после коммита, не успев очистить очередь.
+        with mock.patch.object(queue, "done"):
+            comment_queue.flush()
+        # Пока порция занята, другой процесс ее не берет.
+        self.assertEqual(comment_queue.flush(), 0)
+        with override_settings(COMMENTS_CLAIM_TIMEOUT=-1):
+            self.assertEqual(comment_queue.flush(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+        self.comment("Первый")
+        comment_queue.flush()
+        self.assertEqual(Comment.objects.count(), 2)
+
+        other = Post.objects.create(text="Другой пост", author=self.author)
+        queue.put(other.id, self.user.id, "К удаленному посту")
+        other.delete()
+        call_command("flush_comments", stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(queue.batch(10), [])
+
+    def test_claim_is_disjoint(self):
+        """Два процесса забирают из очереди разные записи."""
+        for text in ("Первый", "Второй", "Третий"):
+            self.comment(text)
+        queue = comment_queue.get_queue()
+        first = queue.claim(2)
+        second = queue.claim(2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(
+            {item.id for item in first} & {item.id for item in second}
+        )
+        self.assertEqual(queue.claim(2), [])
@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="Reader")
+        self.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="slug-test",
+            description="Описание тестовой группы"
+        )
+        self.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author,
+            group=self.group
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = [
+            reverse("index"),
+            reverse("group", args=[self.group.slug]),
+            reverse("profile", args=[self.author.username]),
+            reverse("post", args=[self.author.username, self.post.pk]),
+            reverse(
+                "post_comments", args=[self.author.username, self.post.pk]
+            ),
+        ]
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)["ETag"]
+        return client.get(url, HTTP_IF_NONE_MATCH=etag), etag
+
+    def test_unchanged_pages_return_304(self):
+        for url in self.urls + [reverse("follow_index")]:
+            with self.subTest(url=url):
+                response, _ = self.revalidate(url, self.authorized_client)
+                self.assertEqual(response.status_code, 304)
+
+    def test_304_without_feed_queries(self):
+        etag = self.client.get(reverse("index"))["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse("index"), HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_changes_etag(self):
+        etags = {url: self.client.get(url)["ETag"] for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.user, text="Ок")
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_viewer_etag(self):
+        url = reverse("profile", args=[self.author.username])
+        etag = self.authorized_client.get(url)["ETag"]
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["following"])
+
+    def test_login_changes_etag(self):
+        """После нового входа форма с прежним CSRF-токеном не отдается
+        через 304."""
+        url = reverse("post", args=[self.author.username, self.post.pk])
+        etag = self.authorized_client.get(url)["ETag"]
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.user)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.authorized_client.cookies["csrftoken"] = "a" * 64
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_viewer_is_part_of_etag(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_posts_of_one_author_have_own_etags(self):
+        other = Post.objects.create(text="Другой пост", author=self.author)
+        for name in ("post", "post_comments"):
+            with self.subTest(name=name):
+                etag = self.client.get(
+                    reverse(name, args=[self.author.username, self.post.pk])
+                )["ETag"]
+                response = self.client.get(
+                    reverse(name, args=[self.author.username, other.pk]),
+                    HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_page_number_is_part_of_etag(self):
+        etag = self.client.get(reverse("index"))["ETag"]
+        response = self.client.get(
+            reverse("index") + "?page=2", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_group_edit_changes_etag(self):
+        url = reverse("group", args=[self.group.slug])
+        etag = self.client.get(url)["ETag"]
+        self.group.description = "Новое описание"
+        self.group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_recreated_group_changes_etag(self):
+        """Группа с тем же slug после удаления — другая страница."""
+        url = reverse("group", args=[self.group.slug])
+        etag = self.client.get(url)["ETag"]
+        self.group.delete()
+        Group.objects.create(title="Новая группа", slug=self.group.slug)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Новая группа")
+
+    def test_missing_pages_are_not_conditional(self):
+        response = self.client.get(reverse("profile", args=["nobody"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
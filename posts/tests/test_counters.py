@@ -0,0 +1,54 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="TestUser")
+        self.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author
+        )
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(user=user, field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются вместе с постами, комментариями и подписками."""
+        Comment.objects.create(post=self.post, author=self.user, text="Ок")
+        Follow.objects.create(user=self.user, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertStats(self.author, posts_count=1, followers_count=1)
+        self.assertStats(self.user, following_count=1)
+
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        self.post.delete()
+        self.assertStats(self.author, posts_count=0, followers_count=0)
+        self.assertStats(self.user, following_count=0)
+
+    def test_rebuild_counters_command(self):
+        """Команда rebuild_counters восстанавливает счетчики."""
+        Comment.objects.create(post=self.post, author=self.user, text="Ок")
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.update(comments_count=0)
+        UserStats.objects.all().delete()
+
+        call_command("rebuild_counters", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertStats(self.author, posts_count=1, followers_count=1)
+        self.assertStats(self.user, posts_count=0, following_count=1)
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase
+
+
+class SqliteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings_dict = {
+            **connection.settings_dict,
+            "NAME": os.path.join(directory, "db.sqlite3"),
+        }
+
+    def open(self, **options):
+        backend = load_backend("yatube.sqlite")
+        wrapper = backend.DatabaseWrapper(
+            {**self.settings_dict, "OPTIONS": options}, "pragma_test"
+        )
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        wrapper = self.open()
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 1)
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 5000)
+        self.assertEqual(self.pragma(wrapper, "cache_size"), -65536)
+
+    def test_pragmas_overridden_in_options(self):
+        wrapper = self.open(pragmas={"busy_timeout": 100})
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 100)
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
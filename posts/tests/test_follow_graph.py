@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, override_settings, TestCase
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Follow
+from yatube.replicas import PIN_COOKIE
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
+        self.user = User.objects.create(username="Reader")
+        self.authors = [
+            User.objects.create(username=f"Author{i}") for i in range(3)
+        ]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_follow_views_update_graph(self):
+        author = self.authors[0]
+        self.client.get(reverse("profile_follow", args=[author.username]))
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(self.user, author.pk))
+        self.client.get(reverse("profile_unfollow", args=[author.username]))
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follow_graph.is_following(self.user, author.pk)
+            )
+
+    @override_settings(DATABASE_REPLICAS=["default"])
+    def test_loading_does_not_pin_viewer(self):
+        """Загрузка подписок из основной базы — не запись, и зритель
+        продолжает читать ленты из реплик."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        cache.clear()
+        follow_graph.clear_local()
+        response = self.client.get(
+            reverse("profile", args=[self.authors[0].username])
+        )
+        self.assertTrue(response.context["following"])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_page_of_authors_in_one_batch(self):
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        Follow.objects.create(user=self.user, author=self.authors[2])
+        ids = [author.pk for author in self.authors]
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follow_graph.following(self.user, ids),
+                {self.authors[0].pk, self.authors[2].pk}
+            )
+
+    def test_cold_graph_loads_once(self):
+        Follow.objects.create(user=self.user, author=self.authors[1])
+        cache.clear()
+        follow_graph.clear_local()
+        with self.assertNumQueries(1):
+            follow_graph.followees(self.user.pk)
+            follow_graph.followees(self.user.pk)
+        # Другой процесс берет подписки из общего кэша.
+        follow_graph.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follow_graph.followees(self.user.pk), {self.authors[1].pk}
+            )
+
+    def test_anonymous_follows_nobody(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follow_graph.is_following(AnonymousUser(), self.user.pk)
+            )
+
+    def test_profile_uses_graph(self):
+        author = self.authors[0]
+        Follow.objects.create(user=self.user, author=author)
+        response = self.client.get(
+            reverse("profile", args=[author.username])
+        )
+        self.assertTrue(response.context["following"])
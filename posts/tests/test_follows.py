@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Follow, FollowFeedEntry, Post, UserStats
+
+User = get_user_model()
+
+
+class FollowBatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
+        self.user = User.objects.create(username="Reader")
+        self.authors = [
+            User.objects.create(username=f"Author{i}") for i in range(6)
+        ]
+        for author in self.authors:
+            Post.objects.create(text="Пост", author=author)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def batch(self, **data):
+        return self.client.post(reverse("follow_batch"), data)
+
+    def names(self, authors):
+        return [author.username for author in authors]
+
+    def test_batch_follow(self):
+        response = self.batch(
+            follow=self.names(self.authors[:3]) + ["Nobody", "Reader"]
+        )
+        self.assertEqual(
+            response.json(),
+            {"followed": self.names(self.authors[:3]), "unfollowed": []}
+        )
+        self.assertEqual(
+            Follow.objects.filter(user=self.user).count(), 3
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 3
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.authors[0]).followers_count, 1
+        )
+        self.assertEqual(
+            FollowFeedEntry.objects.filter(user=self.user).count(), 3
+        )
+        self.assertEqual(
+            follow_graph.followees(self.user.pk),
+            {author.pk for author in self.authors[:3]}
+        )
+
+    def test_batch_follow_is_idempotent(self):
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        response = self.batch(follow=self.names(self.authors[:2]))
+        self.assertEqual(response.json()["followed"], ["Author1"])
+        response = self.batch(follow=self.names(self.authors[:2]))
+        self.assertEqual(response.json()["followed"], [])
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 2
+        )
+
+    def test_batch_unfollow(self):
+        for author in self.authors[:3]:
+            Follow.objects.create(user=self.user, author=author)
+        response = self.batch(unfollow=self.names(self.authors[1:4]))
+        self.assertEqual(
+            response.json()["unfollowed"], self.names(self.authors[1:3])
+        )
+        self.assertEqual(
+            list(Follow.objects.filter(user=self.user).values_list(
+                "author_id", flat=True
+            )),
+            [self.authors[0].pk]
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.authors[1]).followers_count, 0
+        )
+        self.assertEqual(
+            FollowFeedEntry.objects.filter(user=self.user).count(), 1
+        )
+        self.assertEqual(
+            follow_graph.followees(self.user.pk), {self.authors[0].pk}
+        )
+
+    def test_counters_match_follows_after_race(self):
+        """Подписки, созданные в обход пачки, не сбивают счетчики."""
+        self.batch(follow=self.names(self.authors[:1]))
+        # Так выглядит подписка, которую вставил параллельный запрос:
+        # строка есть, а счетчики ее еще не учли.
+        Follow.objects.bulk_create(
+            [Follow(user=self.user, author=self.authors[1])]
+        )
+        self.batch(follow=self.names(self.authors[:3]))
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 3
+        )
+        self.batch(unfollow=self.names(self.authors[:3]))
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 0
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.authors[1]).followers_count, 0
+        )
+
+    def test_queries_do_not_depend_on_batch_size(self):
+        # Первая пачка прогревает кэши сессии и популярных авторов.
+        self.batch(follow=self.names(self.authors[:1]))
+        counts = []
+        for authors in (self.authors[1:3], self.authors[3:]):
+            with CaptureQueriesContext(connection) as queries:
+                self.batch(follow=self.names(authors))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    @override_settings(FOLLOW_BATCH_LIMIT=2)
+    def test_batch_limit(self):
+        response = self.batch(follow=self.names(self.authors[:3]))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_batch_requires_post(self):
+        response = self.client.get(reverse("follow_batch"))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import KeysetPaginator
+from posts.timeline import follow_feed
+
+User = get_user_model()
+
+# Полный проход по таблице без индекса.
+FULL_SCAN_RE = re.compile(r"^SCAN (TABLE )?(?!subquery)\S+$")
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="AuthorPost")
+        cls.user = User.objects.create(username="TestUser")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="slug-test",
+            description="Описание тестовой группы"
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=cls.author,
+            group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text="Ок")
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndexes(self, queryset):
+        plan = self.query_plan(queryset)
+        for detail in plan:
+            self.assertNotRegex(detail, FULL_SCAN_RE, plan)
+            self.assertNotIn("TEMP B-TREE", detail, plan)
+
+    def feed_queries(self, paginator):
+        now = timezone.now()
+        return {
+            "page": paginator.numbered.page(1).object_list,
+            "after": paginator.older(now, self.post.pk)[:11],
+            "before": paginator.newer(now, self.post.pk)[:11],
+        }
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент идут по индексам без сортировки в памяти."""
+        feeds = {
+            "index": KeysetPaginator(Post.objects.for_feed()),
+            "group": KeysetPaginator(self.group.posts.for_feed()),
+            "profile": KeysetPaginator(self.author.posts.for_feed()),
+            "follow": KeysetPaginator(
+                follow_feed(self.user).for_feed(),
+                date_field="feed_date",
+                pk_field="feed_post"
+            ),
+        }
+        for feed, paginator in feeds.items():
+            for name, queryset in self.feed_queries(paginator).items():
+                with self.subTest(feed=feed, query=name):
+                    self.assertUsesIndexes(queryset)
+
+    def test_comment_and_follow_queries_use_indexes(self):
+        """Комментарии поста и подписчики автора выбираются по индексам."""
+        queries = {
+            "comments": self.post.comments.all()[:10],
+            "followers": Follow.objects.filter(author=self.author),
+            "following": Follow.objects.filter(user=self.user),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assertUsesIndexes(queryset)
@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template.defaultfilters import linebreaksbr
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import markup
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+TEXT = "Первая строка <b>&\r\nвторая\n\nтретья"
+
+
+def shout(html):
+    return html.upper()
+
+
+class RenderTest(SimpleTestCase):
+    def test_same_as_linebreaksbr(self):
+        self.assertEqual(markup.render(TEXT), linebreaksbr(TEXT))
+
+    @override_settings(POSTS_MARKUP_FILTERS=[f"{__name__}.shout"])
+    def test_filters_get_escaped_html(self):
+        self.assertEqual(
+            markup.render("a <b>\nc"), "A &LT;B&GT;<br>C"
+        )
+
+
+class TextHtmlTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="AuthorPost")
+        self.client.force_login(self.author)
+
+    def test_rendered_on_save(self):
+        self.client.post(reverse("new_post"), data={"text": TEXT})
+        post = Post.objects.get()
+        self.assertEqual(post.text_html, linebreaksbr(TEXT))
+
+        self.client.post(
+            reverse("post_edit", args=[self.author.username, post.pk]),
+            data={"text": "Новый\nтекст"}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, "Новый<br>текст")
+
+        self.client.post(
+            reverse("add_comment", args=[self.author.username, post.pk]),
+            data={"text": "Комментарий\n<i>"}
+        )
+        self.assertEqual(
+            Comment.objects.get().text_html, "Комментарий<br>&lt;i&gt;"
+        )
+
+    def test_pages_show_stored_html(self):
+        """Шаблоны выводят готовый HTML, а не обрабатывают текст."""
+        post = Post.objects.create(text="Текст", author=self.author)
+        Comment.objects.create(post=post, author=self.author, text="Ок")
+        Post.objects.update(text_html="<em>Готовый пост</em>")
+        Comment.objects.update(text_html="<em>Готовый комментарий</em>")
+        response = self.client.get(
+            reverse("post", args=[self.author.username, post.pk])
+        )
+        self.assertContains(response, "<em>Готовый пост</em>")
+        self.assertContains(response, "<em>Готовый комментарий</em>")
+
+    def test_update_without_save_drops_stale_html(self):
+        """UPDATE текста поста мимо save() не оставляет на странице
+        старый HTML."""
+        post = Post.objects.create(text="Старый текст", author=self.author)
+        other = Post.objects.create(text="Старый пост", author=self.author)
+        Post.objects.filter(pk=post.pk).update(text="Новый\nтекст")
+        other.text = "Новый пост"
+        Post.objects.bulk_update([other], ["text"])
+        response = self.client.get(
+            reverse("profile", args=[self.author.username])
+        )
+        self.assertContains(response, "Новый<br>текст")
+        self.assertContains(response, "Новый пост")
+        self.assertNotContains(response, "Старый")
+
+        call_command("render_texts", stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, "Новый<br>текст")
+
+    def test_command_fills_missing_html(self):
+        Post.objects.bulk_create(
+            Post(text=f"Пост\n{i}", author=self.author) for i in range(3)
+        )
+        kept = Post.objects.create(text="Готов", author=self.author)
+        Post.objects.filter(pk=kept.pk).update(text_html="Не трогать")
+
+        call_command("render_texts", batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            sorted(Post.objects.values_list("text_html", flat=True)),
+            ["Не трогать", "Пост<br>0", "Пост<br>1", "Пост<br>2"]
+        )
+
+        with override_settings(POSTS_MARKUP_FILTERS=[f"{__name__}.shout"]):
+            call_command("render_texts", all=True, stdout=StringIO())
+        self.assertEqual(
+            Post.objects.get(pk=kept.pk).text_html, "ГОТОВ"
+        )
@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class SharedPageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="Reader")
+        self.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="slug-test",
+            description="Описание тестовой группы"
+        )
+        self.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author,
+            group=self.group
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.profile_url = reverse("profile", args=[self.author.username])
+        self.post_url = reverse(
+            "post", args=[self.author.username, self.post.pk]
+        )
+        self.urls = [
+            reverse("index"),
+            reverse("group", args=[self.group.slug]),
+            self.profile_url,
+            self.post_url,
+        ]
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторная страница для анонима — без view и без базы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second.content, first.content)
+                self.assertIsNone(second.context)
+
+    def test_viewers_share_page_with_own_holes(self):
+        """Пользователи получают общую страницу со своими фрагментами."""
+        self.client.get(self.profile_url)
+        response = self.authorized_client.get(self.profile_url)
+        self.assertTemplateNotUsed(response, "profile.html")
+        self.assertContains(response, "Пользователь: Reader.")
+        self.assertContains(response, "Подписаться")
+        self.assertContains(response, "Тестовый текст поста")
+
+        response = self.author_client.get(self.profile_url)
+        self.assertTemplateNotUsed(response, "profile.html")
+        self.assertContains(response, "Пользователь: AuthorPost.")
+        self.assertNotContains(response, "Подписаться")
+
+    def test_holes_follow_viewer_changes(self):
+        self.authorized_client.get(self.profile_url)
+        Follow.objects.create(user=self.user, author=self.author)
+        # Подписка меняет счетчики в карточке автора, поэтому страница
+        # рисуется заново, а дальше отдается из кэша.
+        self.client.get(self.profile_url)
+        response = self.authorized_client.get(self.profile_url)
+        self.assertTemplateNotUsed(response, "profile.html")
+        self.assertContains(response, "Отписаться")
+
+    def test_edit_link_only_for_author(self):
+        edit_url = reverse(
+            "post_edit", args=[self.author.username, self.post.pk]
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), edit_url)
+                self.assertNotContains(
+                    self.authorized_client.get(url), edit_url
+                )
+                self.assertContains(self.author_client.get(url), edit_url)
+
+    def test_comment_form_only_for_users(self):
+        self.assertNotContains(self.client.get(self.post_url), "<form")
+        response = self.authorized_client.get(self.post_url)
+        self.assertContains(response, "Добавить комментарий:")
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+    def test_posts_of_one_author_cached_separately(self):
+        other = Post.objects.create(text="Другой пост", author=self.author)
+        other_url = reverse("post", args=[self.author.username, other.pk])
+        for client in (self.client, self.authorized_client):
+            with self.subTest(client=client):
+                self.assertContains(client.get(self.post_url), "Тестовый")
+                response = client.get(other_url)
+                self.assertContains(response, "Другой пост")
+                self.assertNotContains(response, "Тестовый текст поста")
+
+    def test_follow_counts_not_stale(self):
+        """Счетчики подписок в карточке автора меняются после подписки."""
+        for client in (self.client, self.authorized_client):
+            for url in (self.profile_url, self.post_url):
+                client.get(url)
+        reader_url = reverse("profile", args=[self.user.username])
+        self.client.get(reader_url)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertContains(self.client.get(reader_url), "Подписан: 1")
+        for client in (self.client, self.authorized_client):
+            for url in (self.profile_url, self.post_url):
+                with self.subTest(url=url):
+                    self.assertContains(client.get(url), "Подписчиков: 1")
+        self.authorized_client.post(
+            reverse("follow_batch"), {"unfollow": [self.author.username]}
+        )
+        self.assertContains(
+            self.client.get(self.profile_url), "Подписчиков: 0"
+        )
+        self.assertContains(self.client.get(reader_url), "Подписан: 0")
+
+    def test_new_post_replaces_page(self):
+        self.client.get(reverse("index"))
+        Post.objects.create(text="Свежий пост", author=self.author)
+        self.assertContains(self.client.get(reverse("index")), "Свежий пост")
+
+    def test_no_marks_left(self):
+        """Метки дырок не попадают в ответ, а из текста поста их не
+        подделать."""
+        Post.objects.create(text="<!--hole:nav:-->", author=self.author)
+        for client in (self.client, self.authorized_client):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    self.assertNotContains(response, "<!--hole:")
+        response = self.authorized_client.get(reverse("index"))
+        self.assertContains(response, "&lt;!--hole:nav:--&gt;")
+        self.assertContains(response, "Пользователь: Reader.", count=1)
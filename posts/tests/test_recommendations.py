@@ -0,0 +1,126 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    Client, override_settings, TestCase, TransactionTestCase
+)
+from django.urls import reverse
+
+from posts import follow_graph, recommendations
+from posts.models import AuthorRecommendation, Follow
+
+User = get_user_model()
+
+
+@override_settings(RECOMMENDATIONS_SIZE=3)
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
+        self.users = {
+            name: User.objects.create(username=name)
+            for name in ("reader", "friend", "twin", "star", "niche", "other")
+        }
+
+    def follow(self, user, *authors):
+        for author in authors:
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author]
+            )
+
+    def names(self, user):
+        return [
+            username
+            for username, _ in recommendations.who_to_follow(self.users[user])
+        ]
+
+    def test_friends_of_friends_and_co_follows(self):
+        self.follow("friend", "star")
+        self.follow("twin", "friend", "niche")
+        self.follow("reader", "friend")
+        # star читает друг reader, niche — twin, у которого с reader
+        # совпадает половина подписок.
+        self.assertEqual(self.names("reader"), ["star", "niche"])
+
+    def test_followed_authors_are_not_recommended(self):
+        self.follow("friend", "star", "niche")
+        self.follow("reader", "friend")
+        self.follow("reader", "star")
+        self.assertNotIn("star", self.names("reader"))
+        self.assertNotIn("friend", self.names("reader"))
+        self.assertIn("niche", self.names("reader"))
+
+    @override_settings(RECOMMENDATIONS_SAMPLE_SIZE=1)
+    def test_refresh_skips_popular_authors(self):
+        """Подписчики популярного автора при подписке не читаются."""
+        self.follow("twin", "friend", "niche")
+        self.follow("other", "friend")
+        self.follow("reader", "friend")
+        # niche остается только как популярный автор, без оценки по графу.
+        self.assertEqual(
+            AuthorRecommendation.objects.get(
+                user=self.users["reader"], author=self.users["niche"]
+            ).score,
+            0
+        )
+
+    def test_newcomer_gets_popular_authors(self):
+        self.follow("friend", "star")
+        self.follow("twin", "star", "niche")
+        recommendations.rebuild()
+        self.assertEqual(self.names("reader"), ["star", "niche"])
+
+    def test_rebuild_matches_incremental_refresh(self):
+        self.follow("friend", "star")
+        self.follow("twin", "friend", "niche")
+        self.follow("reader", "friend")
+        incremental = self.names("reader")
+        call_command("rebuild_recommendations", stdout=StringIO())
+        self.assertEqual(self.names("reader"), incremental)
+
+    def test_request_costs_one_cache_read(self):
+        self.follow("friend", "star")
+        self.follow("reader", "friend")
+        reader = self.users["reader"]
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                recommendations.who_to_follow(reader)[0][0], "star"
+            )
+
+    def test_shown_on_profile_and_follow_page(self):
+        self.follow("friend", "star")
+        self.follow("reader", "friend")
+        client = Client()
+        client.force_login(self.users["reader"])
+        for url in (reverse("profile", args=["friend"]),
+                    reverse("follow_index")):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertContains(
+                    response, reverse("profile_follow", args=["star"])
+                )
+
+
+@override_settings(RECOMMENDATIONS_SIZE=3)
+class DeleteUserTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
+
+    def test_delete_user_with_follows(self):
+        """Удаление пользователя с подписками не пересчитывает его
+        рекомендации посреди каскада."""
+        reader, author, star = (
+            User.objects.create(username=name)
+            for name in ("reader", "author", "star")
+        )
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=author, author=star)
+        reader.delete()
+        author.delete()
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(AuthorRecommendation.objects.filter(
+            user_id__in=[reader.pk, author.pk]
+        ).exists())
@@ -0,0 +1,178 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    Client, override_settings, TestCase, TransactionTestCase
+)
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.renditions import generate, picture, resolve, variants
+from yatube.settings import BASE_DIR
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+GREEN_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+def uploaded_gif(name="small.gif", content=SMALL_GIF):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type="image/gif"
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Одинаковые картинки хранятся одним файлом, поэтому миниатюры
+        # прошлых тестов убираются.
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        cache.clear()
+        self.author = User.objects.create(username="AuthorPost")
+        self.post = Post.objects.create(
+            text="Пост с картинкой",
+            author=self.author,
+            image=uploaded_gif()
+        )
+
+    def test_placeholder_until_rendition_ready(self):
+        """Пока миниатюры нет, лента показывает заглушку."""
+        self.assertIsNone(picture(self.post.image.name, "card"))
+        response = Client().get(reverse("index"))
+        self.assertNotContains(response, "<img")
+
+        generate(self.post.image.name)
+        cache.clear()
+
+        ready = picture(self.post.image.name, "card")
+        self.assertTrue(ready.src.startswith(settings.MEDIA_URL))
+        response = Client().get(reverse("index"))
+        self.assertContains(response, f'src="{ready.src}"')
+
+    @override_settings(
+        POST_IMAGE_WIDTHS=(480,),
+        POST_IMAGE_FORMATS={"WEBP": {"quality": 75}, "JPEG": {"quality": 82}}
+    )
+    def test_picture_sources(self):
+        """Миниатюра выводится в нескольких ширинах и форматах."""
+        generate(self.post.image.name)
+        for variant in variants(self.post.image.name, "card"):
+            with self.subTest(variant=variant.name):
+                self.assertTrue(default_storage.exists(variant.name))
+        ready = picture(self.post.image.name, "card")
+        self.assertEqual([mime for mime, _ in ready.sources], ["image/webp"])
+        self.assertRegex(ready.srcset, r"\.jpg 480w, .+\.jpg 960w$")
+        response = Client().get(reverse("index"))
+        self.assertContains(response, '<source type="image/webp"')
+
+    @override_settings(
+        POST_IMAGE_FORMATS={"AVIF": {"quality": 50}, "JPEG": {"quality": 82}}
+    )
+    def test_avif_only_when_pillow_supports_it(self):
+        """AVIF выводится, только если Pillow умеет его сохранять."""
+        formats = {
+            variant.format
+            for variant in variants(self.post.image.name, "card")
+        }
+        expected = {"AVIF", "JPEG"} if "AVIF" in Image.SAVE else {"JPEG"}
+        self.assertEqual(formats, expected)
+
+    def test_backfill_renditions_command(self):
+        """Команда backfill_renditions создает недостающие миниатюры."""
+        call_command("backfill_renditions", workers=1, stdout=StringIO())
+        for variant in variants(self.post.image.name, "card"):
+            with self.subTest(variant=variant.name):
+                self.assertTrue(default_storage.exists(variant.name))
+
+    def test_resolve_page_with_one_cache_read(self):
+        """Миниатюры страницы ленты находятся одним чтением из кэша."""
+        second = Post.objects.create(
+            text="Второй пост",
+            author=self.author,
+            image=uploaded_gif("second.gif", GREEN_GIF)
+        )
+        plain = Post.objects.create(text="Без картинки", author=self.author)
+        generate(self.post.image.name)
+        posts = [self.post, second, plain]
+
+        with mock.patch.object(
+            cache, "get_many", wraps=cache.get_many
+        ) as get_many:
+            resolve(posts)
+        get_many.assert_called_once()
+        self.assertEqual(
+            self.post.pictures["card"].src,
+            picture(self.post.image.name, "card").src
+        )
+        self.assertEqual(second.pictures, {})
+        self.assertEqual(plain.pictures, {})
+
+    def test_feeds_do_not_resolve_posts_one_by_one(self):
+        """Ленты не ищут миниатюры по одной на каждый пост."""
+        with mock.patch(
+            "posts.templatetags.post_images.picture",
+            side_effect=AssertionError
+        ):
+            for url in (
+                reverse("index"),
+                reverse("profile", args=[self.author.username]),
+            ):
+                with self.subTest(url=url):
+                    self.assertEqual(Client().get(url).status_code, 200)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_IMAGE_ASYNC=False)
+class RenditionsPipelineTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="TestUser")
+        self.client.force_login(self.user)
+
+    def test_new_post_prepares_renditions(self):
+        """Сохранение поста с картинкой сразу готовит миниатюры."""
+        self.client.post(
+            reverse("new_post"),
+            data={"text": "Новый пост", "image": uploaded_gif()}
+        )
+        post = Post.objects.get(text="Новый пост")
+        self.assertIsNotNone(picture(post.image.name, "card"))
+
+    def test_post_edit_prepares_renditions(self):
+        """Замена картинки при редактировании готовит новые миниатюры."""
+        post = Post.objects.create(text="Пост", author=self.user)
+        self.client.post(
+            reverse("post_edit", args=[self.user.username, post.id]),
+            data={"text": "Пост", "image": uploaded_gif("other.gif")}
+        )
+        post.refresh_from_db()
+        self.assertIsNotNone(picture(post.image.name, "card"))
@@ -0,0 +1,132 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, PostQuerySet
+from yatube import replicas
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTest(SimpleTestCase):
+    def tearDown(self):
+        replicas._state.pinned = False
+
+    def test_feed_reads_go_to_replica(self):
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Post), "replica")
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_pinned_reads_go_to_primary(self):
+        replicas._state.pinned = True
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_writes_go_to_primary(self):
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_write(Post), "default")
+            post = Post(text="Текст")
+            post._state.db = "replica"
+            self.assertEqual(
+                router.db_for_write(Post, instance=post), "default"
+            )
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate("replica", "posts"))
+        self.assertTrue(router.allow_migrate("default", "posts"))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Post), "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaPinTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="Writer")
+        self.client.force_login(self.user)
+
+    def test_write_pins_user_to_primary(self):
+        response = self.client.post(reverse("new_post"), {"text": "Пост"})
+        self.assertRedirects(response, reverse("index"))
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+
+    def test_read_does_not_pin(self):
+        response = self.client.get(reverse("new_post"))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+
+# Реплика-зеркало в TestCase — другое соединение, которое не видит
+# незакоммиченных данных теста, поэтому "репликой" служит сама default,
+# а отставание изображает lagging.
+@override_settings(DATABASE_REPLICAS=["default"])
+class ReplicaCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="AuthorPost")
+        self.post = Post.objects.create(text="Старый пост", author=self.author)
+
+    @contextmanager
+    def lagging(self, post):
+        """Реплика еще не получила post."""
+        for_feed = PostQuerySet.for_feed
+
+        def lagging_for_feed(queryset):
+            queryset = for_feed(queryset)
+            if replicas.reading_replicas():
+                queryset = queryset.exclude(pk=post.pk)
+            return queryset
+
+        with mock.patch.object(PostQuerySet, "for_feed", lagging_for_feed):
+            yield
+
+    def test_lagging_replica_render_is_not_cached(self):
+        """Лента, прочитанная из отставшей реплики, не остается в кэше
+        под поколением, которое уже учитывает новый пост."""
+        authorized_client = self.client_class()
+        authorized_client.force_login(self.author)
+        urls = [reverse("index"), reverse("profile", args=[self.author])]
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        for client in (self.client, authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    with self.lagging(new_post):
+                        response = client.get(url)
+                    self.assertContains(response, "Старый пост")
+                    self.assertNotContains(response, "Новый пост")
+                    self.assertContains(client.get(url), "Новый пост")
+
+
+class ReplicateTest(SimpleTestCase):
+    def test_replica_receives_primary_snapshot(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        primary = os.path.join(directory, "primary.sqlite3")
+        replica = os.path.join(directory, "replica.sqlite3")
+        with sqlite3.connect(primary) as connection:
+            connection.execute("CREATE TABLE post (text TEXT)")
+            connection.execute("INSERT INTO post VALUES ('первый')")
+        replicas.copy_database(primary, replica)
+        with sqlite3.connect(primary) as connection:
+            connection.execute("INSERT INTO post VALUES ('второй')")
+        reader = sqlite3.connect(replica)
+        self.addCleanup(reader.close)
+        self.assertEqual(
+            reader.execute("SELECT count(*) FROM post").fetchone(), (1,)
+        )
+        replicas.copy_database(primary, replica)
+        self.assertEqual(
+            reader.execute("SELECT count(*) FROM post").fetchone(), (2,)
+        )
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import get_backend
+
+User = get_user_model()
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="AuthorPost")
+        cls.cat_post = Post.objects.create(
+            text="Котики гуляют по крыше",
+            author=cls.author
+        )
+        cls.hedgehog_post = Post.objects.create(
+            text="Ёжик в тумане",
+            author=cls.author
+        )
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin"
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("search"), {"q": query, **params})
+        return list(response.context["page"])
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит другие формы слова и не различает е и ё."""
+        self.assertEqual(self.search("котик"), [PostSearchTest.cat_post])
+        self.assertEqual(self.search("крышами"), [PostSearchTest.cat_post])
+        self.assertEqual(
+            self.search("ежики"), [PostSearchTest.hedgehog_post]
+        )
+
+    def test_search_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(text="Собаки лают", author=self.author)
+        self.assertEqual(self.search("собака"), [post])
+        Post.objects.filter(pk=post.pk).update(text="Птицы поют")
+        self.assertEqual(self.search("собака"), [])
+        self.assertEqual(self.search("птица"), [post])
+        post.delete()
+        self.assertEqual(self.search("птица"), [])
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_search_cursor_pages(self):
+        """Результаты поиска листаются курсором по релевантности."""
+        Post.objects.create(
+            text="Котики, котики и еще раз котики",
+            author=self.author
+        )
+        response = self.client.get(reverse("search"), {"q": "котики"})
+        page = response.context["page"]
+        self.assertTrue(page.has_next())
+        second = self.search("котики", after=page.next_cursor)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(page[0], second[0])
+
+    def test_search_bad_cursor_shows_first_page(self):
+        """Некорректный курсор поиска открывает первую страницу."""
+        for cursor in ("1_99999999999999999999999", "nan_1", "inf_1", "bad"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    self.search("котик", after=cursor),
+                    [PostSearchTest.cat_post]
+                )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через тот же индекс."""
+        client = Client()
+        client.force_login(PostSearchTest.admin)
+        response = client.get(
+            reverse("admin:posts_post_changelist"), {"q": "ежик"}
+        )
+        self.assertEqual(
+            list(response.context["cl"].queryset),
+            [PostSearchTest.hedgehog_post]
+        )
+
+    def test_migrate_restores_triggers(self):
+        """migrate возвращает триггеры индекса, удаленные миграцией."""
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER posts_post_fts_update")
+        Post.objects.filter(pk=self.hedgehog_post.pk).update(
+            text="Лошадка в тумане"
+        )
+        call_command("migrate", verbosity=0)
+        self.assertEqual(self.search("лошадка"), [self.hedgehog_post])
+        self.assertEqual(self.search("ежик"), [])
+        Post.objects.filter(pk=self.hedgehog_post.pk).update(
+            text="Ёжик в тумане"
+        )
+        self.assertEqual(self.search("ежик"), [self.hedgehog_post])
+
+    @override_settings(POSTS_SEARCH_BACKEND="posts.search.LikeSearchBackend")
+    def test_like_backend(self):
+        """Запасной бэкенд ищет подстроку."""
+        results = get_backend().search("крыша")
+        self.assertEqual(
+            [post_id for post_id, _ in results], [PostSearchTest.cat_post.pk]
+        )
@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import ImageBlob, Post
+from posts.renditions import variants
+from posts.storage import post_image_storage
+from yatube.settings import BASE_DIR
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name="small.gif", content=SMALL_GIF):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type="image/gif"
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_IMAGE_ASYNC=False)
+class ContentAddressedStorageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="TestUser")
+        self.client.force_login(self.user)
+
+    def publish(self, text, image):
+        self.client.post(
+            reverse("new_post"), data={"text": text, "image": image}
+        )
+        return Post.objects.get(text=text)
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с общими миниатюрами."""
+        first = self.publish("Первый", uploaded_gif("one.gif"))
+        second = self.publish("Второй", uploaded_gif("two.gif"))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^posts/\w\w/\w\w/\w{64}\.gif$")
+        self.assertEqual(ImageBlob.objects.get().refcount, 2)
+
+    def test_blob_deleted_with_last_reference(self):
+        """Файл удаляется вместе с последним постом, который на него
+        ссылается, вместе с миниатюрами."""
+        first = self.publish("Первый", uploaded_gif())
+        second = self.publish("Второй", uploaded_gif())
+        name = first.image.name
+        thumbnails = [variant.name for variant in variants(name, "card")]
+
+        first.delete()
+        self.assertTrue(post_image_storage.exists(name))
+
+        second.delete()
+        self.assertFalse(post_image_storage.exists(name))
+        self.assertFalse(ImageBlob.objects.exists())
+        for thumbnail in thumbnails:
+            with self.subTest(thumbnail=thumbnail):
+                self.assertFalse(post_image_storage.exists(thumbnail))
+
+    def test_replaced_image_released(self):
+        """Замена картинки при редактировании освобождает старый файл."""
+        post = self.publish("Пост", uploaded_gif())
+        old_name = post.image.name
+        other = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+        self.client.post(
+            reverse("post_edit", args=[self.user.username, post.id]),
+            data={"text": "Пост", "image": uploaded_gif(content=other)}
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post_image_storage.exists(old_name))
+        self.assertEqual(
+            list(ImageBlob.objects.values_list("name", "refcount")),
+            [(post.image.name, 1)]
+        )
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings, TestCase
+
+from posts.models import Follow, FollowFeedEntry, Post
+from posts.timeline import follow_feed
+
+User = get_user_model()
+
+
+class FollowTimelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="TestUser")
+        self.old_post = Post.objects.create(
+            text="Пост до подписки",
+            author=self.author
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(
+            FollowFeedEntry.objects.filter(
+                user=self.user, post=self.old_post
+            ).exists()
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertEqual(
+            list(follow_feed(self.user)), [post, self.old_post]
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(
+            FollowFeedEntry.objects.filter(user=self.user).exists()
+        )
+        self.assertFalse(follow_feed(self.user).exists())
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_posts_read_on_demand(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertFalse(
+            FollowFeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertIn(post, follow_feed(self.user))
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=1)
+    def test_author_stops_being_heavy(self):
+        """После отписки до лимита автор снова раскладывается по лентам,
+        а посты, вышедшие, пока он был популярным, дописываются."""
+        other = User.objects.create(username="OtherUser")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        missed = Post.objects.create(text="Пропущенный", author=self.author)
+        self.assertIn(missed, follow_feed(self.user))
+
+        Follow.objects.filter(user=other).delete()
+        self.assertTrue(
+            FollowFeedEntry.objects.filter(
+                user=self.user, post=missed
+            ).exists()
+        )
+        post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertTrue(
+            FollowFeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(
+            list(follow_feed(self.user)), [post, missed, self.old_post]
+        )
+
+    def test_rebuild_command(self):
+        """Команда раскладывает ленты подписок, созданных без сигналов."""
+        Follow.objects.bulk_create(
+            [Follow(user=self.user, author=self.author)]
+        )
+        self.assertFalse(follow_feed(self.user).exists())
+        call_command("rebuild_timelines", stdout=StringIO())
+        self.assertEqual(list(follow_feed(self.user)), [self.old_post])
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, override_settings, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_SIZE=3)
+class TrendingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="AuthorPost")
+        self.groups = [
+            Group.objects.create(
+                title=f"Группа {i}", slug=f"group-{i}", description="Группа"
+            )
+            for i in range(2)
+        ]
+        self.quiet = Post.objects.create(
+            text="Тихий пост", author=self.author, group=self.groups[0]
+        )
+        self.hot = Post.objects.create(
+            text="Обсуждаемый пост", author=self.author, group=self.groups[1]
+        )
+        self.stale = Post.objects.create(
+            text="Старый спор", author=self.author
+        )
+        self.comment(self.hot, 3)
+        # stale много обсуждали, но давно: его оценка почти затухла.
+        self.comment(self.stale, 5)
+        long_ago = timezone.now() - timedelta(hours=30)
+        Post.objects.filter(pk=self.stale.pk).update(pub_date=long_ago)
+        Comment.objects.filter(post=self.stale).update(created=long_ago)
+        trending.aggregator().seed()
+
+    def comment(self, post, count):
+        for i in range(count):
+            Comment.objects.create(post=post, author=self.author, text="Ок")
+
+    def ranked(self):
+        return [post_id for post_id, _ in trending.snapshot()["posts"]]
+
+    def test_comment_velocity_and_decay(self):
+        self.assertEqual(
+            self.ranked(), [self.hot.pk, self.quiet.pk, self.stale.pk]
+        )
+
+    def test_groups_ranked_by_activity(self):
+        groups = [group_id for group_id, _ in trending.snapshot()["groups"]]
+        self.assertEqual(groups, [self.groups[1].pk, self.groups[0].pk])
+
+    def test_new_comments_applied_incrementally(self):
+        self.comment(self.quiet, 5)
+        with self.assertNumQueries(0):
+            ranked = self.ranked()
+        self.assertEqual(ranked[0], self.quiet.pk)
+
+    def test_deleted_post_is_forgotten(self):
+        self.hot.delete()
+        self.assertNotIn(self.hot.pk, self.ranked())
+
+    def test_events_outside_window_are_dropped(self):
+        with self.settings(TRENDING_WINDOW=60 * 60):
+            self.assertNotIn(self.stale.pk, self.ranked())
+
+    def test_snapshot_is_reused(self):
+        trending.snapshot()
+        self.comment(self.quiet, 5)
+        self.assertEqual(
+            [post_id for post_id, _ in trending.trending_now()["posts"]][0],
+            self.hot.pk
+        )
+
+    def test_trending_page(self):
+        user = User.objects.create(username="Reader")
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse("trending"))
+        self.assertEqual(
+            [post.pk for post in response.context["page"]],
+            [self.hot.pk, self.quiet.pk, self.stale.pk]
+        )
+        self.assertEqual(response.context["groups"][0], self.groups[1])
+        self.assertContains(response, reverse("trending"))
+        response = client.get(reverse("index"))
+        self.assertContains(response, reverse("trending"))
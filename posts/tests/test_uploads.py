@@ -0,0 +1,206 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIRequest
+from django.test import (
+    Client, override_settings, RequestFactory, TestCase, TransactionTestCase
+)
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.views import new_post
+from yatube.settings import BASE_DIR
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=BASE_DIR)
+
+ORIENTATION = 0x0112
+
+
+class CountingStream:
+    """wsgi.input, который считает прочитанные байты."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.read_bytes = 0
+
+    def read(self, *args):
+        data = self.stream.read(*args)
+        self.read_bytes += len(data)
+        return data
+
+    def readline(self, *args):
+        data = self.stream.readline(*args)
+        self.read_bytes += len(data)
+        return data
+
+
+def jpeg_file(name="photo.jpg", size=(40, 20), orientation=None):
+    image = Image.new("RGB", size, color=(200, 10, 10))
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif.tobytes())
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create(username="TestUser")
+        self.client.force_login(self.user)
+
+    def assertRejected(self, upload, message):
+        response = self.client.post(
+            reverse("new_post"), data={"text": "Пост", "image": upload}
+        )
+        self.assertFormError(response, "form", "image", message)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIZE=100)
+    def test_upload_size_limit(self):
+        """Файл больше POST_IMAGE_MAX_SIZE отклоняется."""
+        self.assertRejected(
+            jpeg_file(), "Размер картинки не должен превышать 100\xa0байт."
+        )
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_upload_pixel_limit(self):
+        """Картинка с большим числом пикселей отклоняется по заголовку."""
+        self.assertRejected(
+            jpeg_file(), "Картинка слишком большая: 40×20 пикселей."
+        )
+
+    @override_settings(POST_IMAGE_HEADER_SIZE=16)
+    def test_upload_not_an_image(self):
+        """Файл без заголовка картинки отклоняется."""
+        upload = SimpleUploadedFile(
+            name="fake.jpg", content=b"not an image" * 10,
+            content_type="image/jpeg"
+        )
+        self.assertRejected(
+            upload,
+            "Загрузите правильное изображение. Файл, который вы загрузили, "
+            "поврежден или не является изображением."
+        )
+
+    @override_settings(POST_IMAGE_HEADER_SIZE=1024)
+    def test_upload_large_jpeg_metadata(self):
+        """Сегменты метаданных JPEG больше POST_IMAGE_HEADER_SIZE
+        не мешают разобрать заголовок."""
+        content = jpeg_file(orientation=1).read()
+        segments = b"".join(
+            marker + (len(payload) + 2).to_bytes(2, "big") + payload
+            for marker, payload in (
+                (b"\xff\xe1", b"x" * 60000),
+                (b"\xff\xe2", b"y" * 60000),
+                (b"\xff\xfe", b"z" * 3000),
+            )
+        )
+        upload = SimpleUploadedFile(
+            name="camera.jpg", content=content[:2] + segments + content[2:],
+            content_type="image/jpeg"
+        )
+        response = self.client.post(
+            reverse("new_post"), data={"text": "Пост", "image": upload}
+        )
+        self.assertRedirects(response, reverse("index"))
+        self.assertTrue(Post.objects.filter(image__endswith=".jpg").exists())
+
+    def post_counting(self, upload):
+        """Отправляет картинку прямо во view, считая прочитанное тело."""
+        request = RequestFactory().post(
+            reverse("new_post"), data={"text": "Пост", "image": upload}
+        )
+        stream = CountingStream(request.environ["wsgi.input"])
+        request = WSGIRequest({**request.environ, "wsgi.input": stream})
+        request.user = self.user
+        request._dont_enforce_csrf_checks = True
+        return stream, int(request.META["CONTENT_LENGTH"]), request
+
+    @override_settings(POST_IMAGE_MAX_SIZE=100)
+    def test_rejected_upload_not_read_further(self):
+        """После отказа остаток тела запроса не читается."""
+        upload = SimpleUploadedFile(
+            name="big.jpg", content=b"\xff" * 1024 * 1024,
+            content_type="image/jpeg"
+        )
+        stream, content_length, request = self.post_counting(upload)
+        response = new_post(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            request.FILES["image"].upload_error,
+            "Размер картинки не должен превышать 100\xa0байт."
+        )
+        self.assertLess(stream.read_bytes, content_length // 4)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(
+        POST_IMAGE_MAX_SIZE=100, DATA_UPLOAD_MAX_MEMORY_SIZE=1000
+    )
+    def test_too_long_request_not_read(self):
+        """Запрос больше лимитов отклоняется по Content-Length."""
+        upload = SimpleUploadedFile(
+            name="big.jpg", content=b"\xff" * 2000,
+            content_type="image/jpeg"
+        )
+        stream, content_length, request = self.post_counting(upload)
+        with self.assertRaises(RequestDataTooBig):
+            new_post(request)
+        self.assertEqual(stream.read_bytes, 0)
+
+        upload.seek(0)
+        response = self.client.post(
+            reverse("new_post"), data={"text": "Пост", "image": upload}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_upload_still_checks_csrf(self):
+        """Потоковая загрузка не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse("new_post"), data={"text": "Пост", "image": jpeg_file()}
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_IMAGE_ASYNC=False)
+class ImageSanitizeTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="TestUser")
+        self.client.force_login(self.user)
+
+    def test_exif_stripped_and_orientation_applied(self):
+        """После загрузки у картинки нет EXIF, а поворот применен."""
+        self.client.post(
+            reverse("new_post"),
+            data={"text": "Пост", "image": jpeg_file(orientation=6)}
+        )
+        post = Post.objects.get()
+        with default_storage.open(post.image.name) as stored:
+            image = Image.open(stored)
+            self.assertNotIn("exif", image.info)
+            self.assertEqual(image.size, (20, 40))
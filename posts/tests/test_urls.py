@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from posts.models import Group, Post
@@ -26,6 +27,8 @@ class PostsURLTests(TestCase):
         )
 
     def setUp(self):
+        # Из закэшированной страницы шаблоны не рисуются.
+        cache.clear()
         # Создание неавторизованный клиент.
         self.guest_client = Client()
         # Создаем второй авторизованный клиент.
@@ -2,12 +2,17 @@ import shutil
 import tempfile
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, override_settings, TestCase
+from django.core.paginator import Paginator
+from django.test import Client, override_settings, SimpleTestCase, TestCase
 from django.urls import reverse
 from django import forms
 
-from posts.models import Follow, Group, Post
+from posts import follow_graph
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import CursorPage, page_window
+from posts.tests.utils import FeedQueryBudgetMixin
 from yatube.settings import MEDIA_ROOT, BASE_DIR
 
 User = get_user_model()
@@ -68,6 +73,8 @@ class PostsPagesTest(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
+        follow_graph.clear_local()
         # Создаем авторизованный клиент.
         self.user = User.objects.create(username="TestUserLogged")
         self.authorized_client = Client()
@@ -263,20 +270,35 @@ class PostsPagesTest(TestCase):
 
     def test_cache_index_page(self):
         """Кэширование страницы index работает"""
-        # Делаем запрос до записи нового поста.
+        # Делаем запрос до изменения поста.
         response = self.authorized_client.get(reverse("index"))
         # content содержит тело ответа на запрос.
         cached_response_content = response.content
-        # Создаем новый пост.
+        # update() не отправляет сигналы, поэтому кэш не сбрасывается.
+        Post.objects.filter(pk=PostsPagesTest.post.pk).update(
+            text="Измененный текст поста"
+        )
+        response = self.authorized_client.get(reverse("index"))
+        # Если кэш работает, то контент не должен измениться.
+        self.assertEqual(cached_response_content, response.content)
+
+    def test_cache_index_page_reset_by_new_post(self):
+        """Новый пост сбрасывает кэш страницы index."""
+        self.authorized_client.get(reverse("index"))
         Post.objects.create(
             text="Тестовый текст поста 2",
             author=PostsPagesTest.author,
         )
-        # Делаем запрос после записи нового поста.
         response = self.authorized_client.get(reverse("index"))
-        # Сравниваем контент двух запросов.
-        # Если кэш работает, то он не должен измениться.
-        self.assertEqual(cached_response_content, response.content)
+        self.assertContains(response, "Тестовый текст поста 2")
+
+    def test_cache_follow_page_is_per_user(self):
+        """Кэш страницы follow не отдается другому пользователю."""
+        self.authorized_client.get(reverse("follow_index"))
+        response = self.authorized_client_not_follower.get(
+            reverse("follow_index")
+        )
+        self.assertNotContains(response, PostsPagesTest.post.text)
 
     # Проверяем функционал подписок.
     def test_authorized_user_can_remove_to_authors_from_subscribe(self):
@@ -355,6 +377,11 @@ class PaginatorViewsTest(TestCase):
         )
         Post.objects.bulk_create(objs)
 
+    def setUp(self):
+        # bulk_create не сдвигает поколения лент, а страницы целиком
+        # кэшируются, см. posts.page_cache.
+        cache.clear()
+
     # Проверяем работу паджинатора на главной странице.
     def test_index_first_page_containse_ten_records(self):
         """Количество постов на первой index странице равно 10"""
@@ -386,3 +413,198 @@ class PaginatorViewsTest(TestCase):
             ) + "?page=2"
         )
         self.assertEqual(len(response.context.get("page").object_list), 3)
+
+    def test_index_pages_cached_separately(self):
+        """Кэш ленты учитывает номер страницы."""
+        cache.clear()
+        first = self.client.get(reverse("index"))
+        second = self.client.get(reverse("index") + "?page=2")
+        self.assertNotEqual(first.content, second.content)
+
+    # Проверяем переход по курсорам за пределами пронумерованных страниц.
+    @override_settings(PAGINATOR_NUMBERED_PAGES=1)
+    def test_index_cursor_pages(self):
+        """За последней пронумерованной страницей лента листается
+        курсорами вперед и назад.
+        """
+        response = self.client.get(reverse("index"))
+        first_page = response.context.get("page")
+        self.assertIsNotNone(first_page.next_cursor)
+        response = self.client.get(
+            reverse("index") + f"?after={first_page.next_cursor}"
+        )
+        page = response.context.get("page")
+        self.assertEqual(len(page.object_list), 3)
+        self.assertFalse(page.has_next())
+        self.assertNotIn(page[0], first_page.object_list)
+        response = self.client.get(
+            reverse("index") + f"?before={page.previous_cursor}"
+        )
+        self.assertEqual(
+            list(response.context.get("page").object_list),
+            list(first_page.object_list)
+        )
+
+    def test_index_invalid_cursor_shows_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.client.get(reverse("index") + "?after=bad")
+        self.assertEqual(response.context.get("page").number, 1)
+
+    def test_index_oversized_cursor_shows_first_page(self):
+        """Курсор со слишком большими числами открывает первую страницу."""
+        for cursor in (
+            "99999999999999999999999-1",
+            "999999999999999999-1",
+            "1-99999999999999999999999",
+            "1-9999999999999999999",
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("index"), {"after": cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context.get("page").number, 1)
+
+    @override_settings(POSTS_PER_PAGE=1, PAGINATOR_NUMBERED_PAGES=13)
+    def test_index_paginator_window(self):
+        """Навигация показывает концы ленты и окно вокруг текущей
+        страницы, а не все страницы подряд.
+        """
+        cache.clear()
+        response = self.client.get(reverse("index") + "?page=7")
+        for number in (1, 5, 9, 13):
+            self.assertContains(response, f'href="?page={number}"')
+        for number in (2, 4, 10, 12):
+            self.assertNotContains(response, f'href="?page={number}"')
+        self.assertContains(response, "&hellip;", count=2)
+
+
+class PageWindowTest(SimpleTestCase):
+    def window(self, number, num_pages=100000):
+        paginator = Paginator(range(num_pages), 1)
+        return list(page_window(
+            paginator.page(number), on_each_side=2, on_ends=1
+        ))
+
+    def test_window_in_the_middle(self):
+        self.assertEqual(
+            self.window(50000), [1, None, 49998, 49999, 50000, 50001, 50002,
+                                 None, 100000]
+        )
+
+    def test_window_near_the_ends(self):
+        self.assertEqual(self.window(3), [1, 2, 3, 4, 5, None, 100000])
+        self.assertEqual(
+            self.window(100000), [1, None, 99998, 99999, 100000]
+        )
+        self.assertEqual(self.window(2, num_pages=5), [1, 2, 3, 4, 5])
+
+    def test_cursor_page_follows_numbered_pages(self):
+        paginator = Paginator(range(10), 1)
+        page = CursorPage([], paginator)
+        self.assertEqual(
+            list(page_window(page, on_each_side=2, on_ends=1)),
+            [1, None, 9, 10]
+        )
+
+
+class FeedQueriesTest(FeedQueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="AuthorPost")
+        self.user = User.objects.create(username="TestUser")
+        self.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="slug-test",
+            description="Описание тестовой группы"
+        )
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def add_post(self):
+        post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author,
+            group=self.group
+        )
+        Comment.objects.create(post=post, author=self.user, text="Ок")
+        return Post.objects.count()
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от количества постов."""
+        # Сессия и пользователь, COUNT(*) по срезу и сама страница.
+        feeds = {
+            reverse("index"): 4,
+            # Плюс id группы или автора для ETag, пока его нет в кэше.
+            reverse("group", kwargs={"slug": self.group.slug}): 6,
+            # И подписки зрителя и его рекомендации.
+            reverse("profile", kwargs={"username": self.author}): 8,
+            # Плюс список популярных авторов для ленты подписок
+            # и рекомендации.
+            reverse("follow_index"): 6,
+        }
+        for url, budget in feeds.items():
+            self.assertFeedQueryBudget(
+                self.authorized_client, url, budget, self.add_post
+            )
+
+
+@override_settings(COMMENTS_PREVIEW_SIZE=3, COMMENTS_PER_PAGE=2)
+class CommentsPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username="AuthorPost")
+        self.post = Post.objects.create(
+            text="Тестовый текст поста",
+            author=self.author
+        )
+        self.comments = [
+            Comment.objects.create(
+                post=self.post, author=self.author, text=f"Комментарий {i}"
+            )
+            for i in range(6)
+        ]
+        self.post_url = reverse("post", args=[self.author, self.post.id])
+        self.more_url = reverse(
+            "post_comments", args=[self.author, self.post.id]
+        )
+
+    def test_post_page_shows_newest_comments(self):
+        """На странице поста только самые новые комментарии."""
+        response = self.client.get(self.post_url)
+        self.assertEqual(
+            list(response.context["comments"]), self.comments[:2:-1]
+        )
+        self.assertContains(response, self.more_url + "?after=")
+
+    def test_load_more_comments(self):
+        """Остальные комментарии догружаются порциями по курсору."""
+        cursor = self.client.get(self.post_url).context["comments_cursor"]
+        response = self.client.get(self.more_url, {"after": cursor})
+        self.assertEqual(
+            list(response.context["comments"]), self.comments[2:0:-1]
+        )
+
+        cursor = response.context["comments_cursor"]
+        response = self.client.get(
+            self.more_url, {"after": cursor, "format": "json"}
+        )
+        data = response.json()
+        self.assertEqual(
+            [comment["id"] for comment in data["comments"]],
+            [self.comments[0].id]
+        )
+        self.assertIsNone(data["next"])
+
+    def test_post_page_query_budget(self):
+        """Число запросов страницы поста не зависит от числа
+        комментариев."""
+        # Пост с автором и группой и сами комментарии. В первый раз
+        # еще автор поста для ETag, потом он берется из кэша.
+        with self.assertNumQueries(3):
+            self.client.get(self.post_url)
+        for i in range(10):
+            Comment.objects.create(
+                post=self.post, author=User.objects.create(username=f"u{i}"),
+                text="Еще комментарий"
+            )
+        with self.assertNumQueries(2):
+            self.client.get(self.post_url)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from posts import follow_graph
+
+
+class FeedQueryBudgetMixin:
+    """Проверка числа запросов к БД при выводе ленты."""
+
+    def assertFeedQueryBudget(self, client, url, budget, add_post,
+                              page_sizes=None):
+        """Страница ленты укладывается в budget запросов при любом
+        количестве постов на ней.
+
+        add_post создает очередной пост ленты и возвращает их общее число.
+        """
+        total = 0
+        for page_size in page_sizes or (1, settings.POSTS_PER_PAGE):
+            while total < page_size:
+                total = add_post()
+            cache.clear()
+            follow_graph.clear_local()
+            with self.subTest(url=url, page_size=page_size):
+                with self.assertNumQueries(budget):
+                    client.get(url)
@@ -0,0 +1,142 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import feed_cache
+from .models import Follow, FollowFeedEntry, Post, UserStats
+
+
+def heavy_author_ids(author_ids):
+    """Популярные авторы среди author_ids.
+
+    У них больше FOLLOW_FEED_FANOUT_LIMIT подписчиков, их посты не
+    раскладываются по лентам подписчиков, а подмешиваются в ленту при
+    чтении (fan-out on read). Признак берется из UserStats при каждом
+    обращении, поэтому автор перестает быть популярным вместе
+    со счетчиком.
+    """
+    return set(
+        UserStats.objects.filter(
+            user_id__in=author_ids,
+            followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT
+        ).values_list("user_id", flat=True)
+    )
+
+
+def _materialize(user_ids, posts):
+    """Записывает посты (id, автор, дата) в ленты пользователей."""
+    FollowFeedEntry.objects.bulk_create(
+        (
+            FollowFeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date
+            )
+            for user_id in user_ids
+            for post_id, author_id, pub_date in posts
+        ),
+        batch_size=settings.FOLLOW_FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if heavy_author_ids([post.author_id]):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _materialize(
+        followers.iterator(), [(post.pk, post.author_id, post.pub_date)]
+    )
+
+
+def _posts(author_ids):
+    return Post.objects.filter(author_id__in=author_ids).values_list(
+        "id", "author_id", "pub_date"
+    )
+
+
+def backfill(user_id, *author_ids):
+    """Добавляет в ленту подписчика уже опубликованные посты авторов."""
+    author_ids = set(author_ids) - heavy_author_ids(author_ids)
+    if not author_ids:
+        return
+    _materialize([user_id], _posts(author_ids).iterator())
+
+
+def refill(*author_ids):
+    """Раскладывает посты авторов, переставших быть популярными.
+
+    Вызывается после отписки. Если подписчиков осталось ровно
+    FOLLOW_FEED_FANOUT_LIMIT, автор только что вернулся к раскладке
+    при публикации, и посты, вышедшие, пока он был популярным,
+    дописываются в ленты всех его подписчиков.
+    """
+    lightened = UserStats.objects.filter(
+        user_id__in=author_ids,
+        followers_count=settings.FOLLOW_FEED_FANOUT_LIMIT
+    ).values_list("user_id", flat=True)
+    for author_id in lightened:
+        followers = list(
+            Follow.objects.filter(author_id=author_id).values_list(
+                "user_id", flat=True
+            )
+        )
+        _materialize(followers, list(_posts([author_id])))
+        feed_cache.bump(*(f"follow:{user_id}" for user_id in followers))
+
+
+def rebuild():
+    """Заново раскладывает ленты всех подписчиков по таблице подписок.
+
+    Для баз, где подписки появились в обход сигналов, например до
+    появления материализованной ленты.
+    """
+    authors = defaultdict(list)
+    for user_id, author_id in Follow.objects.values_list(
+        "user_id", "author_id"
+    ).iterator():
+        authors[user_id].append(author_id)
+    for user_id, author_ids in authors.items():
+        with transaction.atomic():
+            FollowFeedEntry.objects.filter(user_id=user_id).delete()
+            backfill(user_id, *author_ids)
+    return len(authors)
+
+
+def prune(user_id, *author_ids):
+    """Убирает посты авторов из ленты бывшего подписчика."""
+    FollowFeedEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ).delete()
+
+
+def follow_feed(user):
+    """Лента подписок пользователя.
+
+    Посты аннотированы ключом ленты feed_date и feed_post: обычно это один
+    проход по индексу (user, -pub_date, -post) материализованной ленты,
+    посты популярных авторов подмешиваются при чтении.
+    """
+    heavy = list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=(
+                settings.FOLLOW_FEED_FANOUT_LIMIT
+            )
+        ).values_list("author_id", flat=True)
+    )
+    if not heavy:
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F("feed_entries__pub_date"),
+            feed_post=F("feed_entries__post_id")
+        )
+    entries = FollowFeedEntry.objects.filter(user=user).values("post_id")
+    return Post.objects.filter(
+        Q(id__in=entries) | Q(author_id__in=heavy)
+    ).annotate(feed_date=F("pub_date"), feed_post=F("id"))
@@ -0,0 +1,201 @@
+import heapq
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Comment, Post, UserStats
+
+SNAPSHOT_KEY = "trending:snapshot"
+# После стольких периодов полураспада оценки приводятся к новому началу
+# отсчета, чтобы 2 ** x не переполнилось.
+REBASE_AFTER = 256
+
+
+def _post_weight(followers):
+    # Посты авторов с большой аудиторией стартуют выше, но логарифм
+    # не дает им затмить обсуждаемые посты.
+    return settings.TRENDING_POST_WEIGHT * (
+        1 + settings.TRENDING_FOLLOWER_WEIGHT * math.log1p(followers)
+    )
+
+
+class Aggregator:
+    """Затухающие оценки постов и групп в памяти процесса.
+
+    Событие с весом w в момент t добавляет к оценке w·2^((t − origin)/T),
+    где T — TRENDING_HALF_LIFE. Так оценки не нужно пересчитывать
+    с течением времени: порядок между ними не меняется, а к текущему
+    моменту они приводятся только при снимке. Посты и группы без событий
+    за TRENDING_WINDOW выбрасываются.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seeded = None
+        self._reset()
+
+    def _reset(self):
+        self.origin = time.time()
+        # post_id -> [оценка, последнее событие, group_id]
+        self.posts = {}
+        # group_id -> [оценка, последнее событие]
+        self.groups = {}
+
+    def _factor(self, moment):
+        return 2 ** ((moment - self.origin) / settings.TRENDING_HALF_LIFE)
+
+    def _add(self, post_id, group_id, weight, moment):
+        value = weight * self._factor(moment)
+        post = self.posts.setdefault(post_id, [0.0, moment, group_id])
+        post[0] += value
+        post[1] = max(post[1], moment)
+        if group_id is not None:
+            group = self.groups.setdefault(group_id, [0.0, moment])
+            group[0] += value
+            group[1] = max(group[1], moment)
+
+    def add_post(self, post_id, group_id, moment, followers):
+        with self.lock:
+            self._add(post_id, group_id, _post_weight(followers), moment)
+
+    def add_comment(self, post_id, group_id, moment):
+        with self.lock:
+            self._add(
+                post_id, group_id, settings.TRENDING_COMMENT_WEIGHT, moment
+            )
+
+    def remove_post(self, post_id):
+        with self.lock:
+            post = self.posts.pop(post_id, None)
+            if post is not None and post[2] in self.groups:
+                self.groups[post[2]][0] -= post[0]
+
+    def group_of(self, post_id):
+        """Группа поста, если он уже есть в агрегаторе, иначе False."""
+        post = self.posts.get(post_id)
+        return False if post is None else post[2]
+
+    def seed(self):
+        """Заполняет агрегатор событиями из базы за TRENDING_WINDOW.
+
+        Так учитываются и события, записанные другими процессами.
+        """
+        since = timezone.now() - timezone.timedelta(
+            seconds=settings.TRENDING_WINDOW
+        )
+        posts = Post.objects.filter(pub_date__gte=since).values_list(
+            "id", "group_id", "pub_date", "author__stats__followers_count"
+        )
+        comments = Comment.objects.filter(created__gte=since).values_list(
+            "post_id", "post__group_id", "created"
+        )
+        with self.lock:
+            self._reset()
+            for post_id, group_id, pub_date, followers in posts.iterator():
+                self._add(
+                    post_id, group_id, _post_weight(followers or 0),
+                    pub_date.timestamp()
+                )
+            for post_id, group_id, created in comments.iterator():
+                self._add(
+                    post_id, group_id, settings.TRENDING_COMMENT_WEIGHT,
+                    created.timestamp()
+                )
+            self.seeded = time.monotonic()
+
+    def top(self, now, size):
+        """Лучшие посты и группы: списки (id, оценка на момент now)."""
+        horizon = now - settings.TRENDING_WINDOW
+        with self.lock:
+            for table in (self.posts, self.groups):
+                for key in [k for k, v in table.items() if v[1] < horizon]:
+                    del table[key]
+            factor = self._factor(now)
+            if math.log2(factor) > REBASE_AFTER:
+                for table in (self.posts, self.groups):
+                    for value in table.values():
+                        value[0] /= factor
+                self.origin, factor = now, 1.0
+            posts = heapq.nlargest(
+                size, self.posts.items(), key=lambda item: item[1][0]
+            )
+            groups = heapq.nlargest(
+                size, self.groups.items(), key=lambda item: item[1][0]
+            )
+        return (
+            [(pk, value[0] / factor) for pk, value in posts],
+            [(pk, value[0] / factor) for pk, value in groups],
+        )
+
+
+_aggregator = Aggregator()
+
+
+def aggregator():
+    """Агрегатор процесса, заполненный из базы не раньше чем
+    TRENDING_RESEED_INTERVAL секунд назад."""
+    seeded = _aggregator.seeded
+    if (
+        seeded is None
+        or time.monotonic() - seeded > settings.TRENDING_RESEED_INTERVAL
+    ):
+        _aggregator.seed()
+    return _aggregator
+
+
+def record_post(post):
+    # До первого заполнения события не нужны: seed прочитает их из базы.
+    if _aggregator.seeded is None:
+        return
+    followers = UserStats.objects.filter(user_id=post.author_id).values_list(
+        "followers_count", flat=True
+    ).first()
+    _aggregator.add_post(
+        post.pk, post.group_id, post.pub_date.timestamp(), followers or 0
+    )
+
+
+def record_comment(comment, group_id=False):
+    if _aggregator.seeded is None:
+        return
+    if group_id is False:
+        group_id = _aggregator.group_of(comment.post_id)
+    if group_id is False:
+        group_id = Post.objects.filter(pk=comment.post_id).values_list(
+            "group_id", flat=True
+        ).first()
+    _aggregator.add_comment(
+        comment.post_id, group_id, comment.created.timestamp()
+    )
+
+
+def forget_post(post_id):
+    _aggregator.remove_post(post_id)
+
+
+def snapshot():
+    """Сохраняет в кэш текущие лучшие посты и группы."""
+    now = time.time()
+    posts, groups = aggregator().top(now, settings.TRENDING_SIZE)
+    data = {"taken": now, "posts": posts, "groups": groups}
+    cache.set(SNAPSHOT_KEY, data, None)
+    return data
+
+
+def trending_now():
+    """Последний снимок популярного; устаревший снимок обновляется.
+
+    Обычно это одно чтение из кэша: снимок пересчитывается из памяти
+    процесса не чаще раза в TRENDING_SNAPSHOT_INTERVAL секунд.
+    """
+    data = cache.get(SNAPSHOT_KEY)
+    if (
+        data is None
+        or time.time() - data["taken"] > settings.TRENDING_SNAPSHOT_INTERVAL
+    ):
+        data = snapshot()
+    return data
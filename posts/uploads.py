@@ -0,0 +1,216 @@
+import hashlib
+from functools import wraps
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile, UploadedFile
+)
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+from .models import Post
+
+# Форматы, которые пережимаются без потерь анимации и прозрачности.
+REENCODED_FORMATS = ("JPEG", "PNG", "WEBP")
+# Метаданные в Image.info, ради которых картинка пережимается.
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+# Начало JPEG и маркеры его сегментов с метаданными: APP0–APP15 и COM.
+JPEG_START = b"\xff\xd8"
+JPEG_METADATA_MARKERS = frozenset(range(0xE0, 0xF0)) | {0xFE}
+
+
+class RejectedUpload(UploadedFile):
+    """Пустой файл вместо отклоненной загрузки: форма покажет ошибку."""
+
+    def __init__(self, name, error):
+        super().__init__(BytesIO(), name, size=0)
+        self.upload_error = error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Потоковый прием картинок постов.
+
+    Куски запроса сразу пишутся во временный файл, из которого
+    FileSystemStorage потом просто переносит его на место. Размер
+    проверяется на каждом куске, формат и число пикселей — по заголовку,
+    как только его удается разобрать. Сегменты метаданных JPEG в начале
+    файла (EXIF, XMP, ICC-профиль камеры бывают больше
+    POST_IMAGE_HEADER_SIZE) в заголовок не копируются, а пропускаются.
+    Слишком большой или поддельный
+    файл обрывает разбор запроса: остаток тела не читается, а
+    отклоненная загрузка попадает в rejected, откуда ее забирает
+    streaming_image_uploads. Запрос, который заведомо не уложится в
+    лимиты, отклоняется по Content-Length, не читаясь вовсе. Попутно
+    считается SHA-256 для posts.storage.ContentAddressedStorage.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.rejected = []
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if settings.DATA_UPLOAD_MAX_MEMORY_SIZE is None:
+            return None
+        # Обычные поля ограничены DATA_UPLOAD_MAX_MEMORY_SIZE, файл —
+        # POST_IMAGE_MAX_SIZE, больше в теле запроса быть нечему.
+        limit = (
+            settings.POST_IMAGE_MAX_SIZE
+            + settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        )
+        if content_length > limit:
+            raise RequestDataTooBig(
+                "Request body exceeded POST_IMAGE_MAX_SIZE."
+            )
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra
+        )
+        self.header = b""
+        self.skip = 0
+        self.hasher = hashlib.sha256()
+        self.image_format = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.POST_IMAGE_MAX_SIZE:
+            self.reject("Размер картинки не должен превышать {}.".format(
+                filesizeformat(settings.POST_IMAGE_MAX_SIZE)
+            ))
+        if self.image_format is None:
+            self.check_header(raw_data)
+        self.file.write(raw_data)
+        self.hasher.update(raw_data)
+        return None
+
+    def reject(self, error):
+        """Отклоняет файл и прекращает чтение запроса."""
+        self.file.close()
+        self.rejected.append(
+            (self.field_name, RejectedUpload(self.file_name, error))
+        )
+        raise StopUpload(connection_reset=True)
+
+    def skip_jpeg_metadata(self):
+        """Вырезает из заголовка JPEG сегменты метаданных после SOI.
+
+        Сегмент, который еще не пришел целиком, дочитывается мимо
+        заголовка: остаток его длины запоминается в skip.
+        """
+        position = len(JPEG_START)
+        while len(self.header) >= position + 4:
+            if (
+                self.header[position] != 0xFF
+                or self.header[position + 1] not in JPEG_METADATA_MARKERS
+            ):
+                return
+            end = position + 2 + int.from_bytes(
+                self.header[position + 2:position + 4], "big"
+            )
+            self.skip = max(end - len(self.header), 0)
+            self.header = self.header[:position] + self.header[end:]
+
+    def check_header(self, raw_data):
+        skipped = min(self.skip, len(raw_data))
+        self.skip -= skipped
+        self.header += raw_data[skipped:]
+        if self.header.startswith(JPEG_START):
+            self.skip_jpeg_metadata()
+        try:
+            # Image.open читает только заголовок, пиксели не декодируются.
+            with Image.open(BytesIO(self.header)) as image:
+                image_format, (width, height) = image.format, image.size
+        except Exception:
+            if len(self.header) >= settings.POST_IMAGE_HEADER_SIZE:
+                self.reject(
+                    forms.ImageField.default_error_messages["invalid_image"]
+                )
+            return
+        self.header = b""
+        if image_format not in settings.POST_IMAGE_UPLOAD_FORMATS:
+            self.reject(
+                forms.ImageField.default_error_messages["invalid_image"]
+            )
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            self.reject(
+                f"Картинка слишком большая: {width}×{height} пикселей."
+            )
+        self.image_format = image_format
+
+    def file_complete(self, file_size):
+        if self.image_format is None:
+            # Файл кончился раньше, чем разобрался заголовок.
+            self.file.close()
+            return RejectedUpload(
+                self.file_name,
+                forms.ImageField.default_error_messages["invalid_image"]
+            )
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_digest = self.hasher.hexdigest()
+        return self.file
+
+
+def streaming_image_uploads(view):
+    """Принимает картинки во view через ImageUploadHandler.
+
+    Обработчики загрузки нужно заменить до того, как CsrfViewMiddleware
+    прочитает тело запроса, поэтому CSRF проверяется уже внутри view.
+    Отклоненный файл парсер в FILES не кладет, он добавляется туда
+    здесь, чтобы форма показала ошибку.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        handler = ImageUploadHandler(request)
+        request.upload_handlers = [handler]
+        if request.method == "POST":
+            files = request.FILES
+            for field_name, upload in handler.rejected:
+                files.appendlist(field_name, upload)
+        return protected(request, *args, **kwargs)
+
+    return wrapper
+
+
+def sanitize(image_name):
+    """Пережимает загруженную картинку без EXIF и других метаданных.
+
+    Поворот из EXIF применяется к самим пикселям. Картинки без
+    метаданных, анимации и форматы не из REENCODED_FORMATS остаются
+    как есть, поэтому повторный вызов ничего не меняет.
+    """
+    storage = Post._meta.get_field("image").storage
+    with storage.open(image_name) as source:
+        image = Image.open(source)
+        if (
+            image.format not in REENCODED_FORMATS
+            or getattr(image, "n_frames", 1) > 1
+            or not any(key in image.info for key in METADATA_KEYS)
+        ):
+            return
+        image_format = image.format
+        image.load()
+    icc_profile = image.info.get("icc_profile")
+    image = ImageOps.exif_transpose(image)
+    params = {"optimize": True}
+    if image_format in ("JPEG", "WEBP"):
+        params["quality"] = settings.POST_IMAGE_UPLOAD_QUALITY
+    if icc_profile:
+        params["icc_profile"] = icc_profile
+    buffer = BytesIO()
+    image.save(buffer, image_format, **params)
+    # Имя файла — хеш исходной загрузки, поэтому повторная загрузка той
+    # же картинки найдет уже очищенную копию.
+    storage.overwrite(image_name, ContentFile(buffer.getvalue()))
@@ -1,88 +1,160 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import condition, require_POST
 from django.contrib.auth import get_user_model
-from django.core.paginator import Paginator
-
+from yatube.replicas import read_from_replicas
+from . import etags
+from .comment_queue import enqueue
+from .counters import user_stats
+from .feed_cache import feed_cache
+from .follows import follow_many, unfollow_many
 from .models import Follow, Group, Post
 from .forms import CommentForm, PostForm
+from .page_cache import shared_page
+from .paginator import decode_cursor, encode_cursor, KeysetPaginator, paginate
+from .renditions import schedule
+from .search import search_page
+from .timeline import follow_feed
+from .trending import trending_now
+from .uploads import streaming_image_uploads
 
 User = get_user_model()
 
 
+@read_from_replicas
+@condition(etag_func=etags.index_etag)
+@shared_page(etags.index_scopes)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page, paginator = paginate(request, post_list)
     context = {
         "page": page,
         "paginator": paginator,
+        **feed_cache(request, page, "index", "posts"),
     }
     return render(request, "index.html", context)
 
 
+@read_from_replicas
+@condition(etag_func=etags.group_etag)
+@shared_page(etags.group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = group.posts.for_feed()
+    page, paginator = paginate(request, post_list)
     context = {
         "page": page,
         "group": group,
         "paginator": paginator,
+        **feed_cache(request, page, "group", f"group:{group.pk}"),
     }
     return render(request, "group.html", context)
 
 
 @login_required
+@streaming_image_uploads
 def new_post(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == "POST" and form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        schedule(post)
         return redirect("index")
     return render(request, "new_post.html", {"form": form})
 
 
+@read_from_replicas
+@condition(etag_func=etags.profile_etag)
+@shared_page(etags.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post = author.posts.all()
-    paginator = Paginator(post, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = (request.user.is_authenticated and (
-        Follow.objects.filter(user=request.user, author=author).exists())
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
     )
+    user_stats(author)
+    post = author.posts.for_feed()
+    page, paginator = paginate(request, post)
     context = {
         "page": page,
         "author": author,
         "paginator": paginator,
-        "following": following
+        **feed_cache(request, page, "profile", f"author:{author.pk}"),
     }
     return render(request, "profile.html", context)
 
 
+@read_from_replicas
+@condition(etag_func=etags.post_etag)
+@shared_page(etags.post_view_scopes)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related("author__stats"),
+        id=post_id,
+        author__username=username
+    )
     author = post.author
+    user_stats(author)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    following = (request.user.is_authenticated and (
-        Follow.objects.filter(user=request.user, author=author).exists())
-    )
+    # На странице поста только самые новые комментарии, остальные
+    # догружаются через post_comments.
+    comments = post.comments.select_related("author").order_by(
+        "-created", "-id"
+    )[:settings.COMMENTS_PREVIEW_SIZE]
+    comments_cursor = None
+    # Счетчик подсказывает, есть ли что догружать, без COUNT(*).
+    if comments and post.comments_count > len(comments):
+        last = comments[len(comments) - 1]
+        comments_cursor = encode_cursor(last.created, last.pk)
     context = {
         "post": post,
         "author": author,
         "comments": comments,
+        "comments_cursor": comments_cursor,
         "form": form,
-        "following": following
     }
     return render(request, "post.html", context)
 
 
+# Следующая порция комментариев к посту: HTML-фрагмент или JSON.
+@condition(etag_func=etags.post_comments_etag)
+def post_comments(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.only("id"), id=post_id, author__username=username
+    )
+    paginator = KeysetPaginator(
+        post.comments.select_related("author"),
+        per_page=settings.COMMENTS_PER_PAGE,
+        date_field="created"
+    )
+    page = paginator.page_after(
+        *(decode_cursor(request.GET.get("after")) or ())
+    )
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "comments": [
+                {
+                    "id": comment.id,
+                    "author": comment.author.username,
+                    "text": comment.text,
+                    "created": comment.created.isoformat(),
+                }
+                for comment in page
+            ],
+            "next": page.next_cursor,
+        })
+    context = {
+        "comments": page,
+        "comments_cursor": page.next_cursor,
+        "username": username,
+        "post_id": post.id,
+    }
+    return render(request, "includes/comment_list.html", context)
+
+
 @login_required
+@streaming_image_uploads
 def post_edit(request, username, post_id):
     # Редактировать пост имеет право только его автор.
     if request.user.username != username:
@@ -93,6 +165,8 @@ def post_edit(request, username, post_id):
     )
     if request.method == "POST" and form.is_valid():
         form.save()
+        if "image" in form.changed_data:
+            schedule(post)
         return redirect("post", username, post_id)
     return render(request, "new_post.html", {"form": form, "post": post})
 
@@ -115,6 +189,11 @@ def server_error(request):
 @login_required
 def add_comment(request, username, post_id):
     form = CommentForm(request.POST or None)
+    if settings.COMMENTS_WRITE_BEHIND:
+        # Комментарий попадет в базу пачкой, см. posts.comment_queue.
+        if request.method == "POST" and form.is_valid():
+            enqueue(post_id, request.user.pk, form.cleaned_data["text"])
+        return redirect("post", username, post_id)
     post = get_object_or_404(Post, id=post_id)
     if request.method == "POST" and form.is_valid():
         comment = form.save(commit=False)
@@ -126,18 +205,55 @@ def add_comment(request, username, post_id):
 
 # Подписки пользователя на авторов.
 @login_required
+@condition(etag_func=etags.follow_etag)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = follow_feed(request.user).for_feed()
+    page, paginator = paginate(
+        request, post_list, date_field="feed_date", pk_field="feed_post"
+    )
     context = {
         "page": page,
         "paginator": paginator,
+        **feed_cache(
+            request, page, "follow", f"follow:{request.user.pk}", "posts"
+        ),
     }
     return render(request, "follow.html", context)
 
 
+# Популярные посты и группы по снимку posts.trending.
+def trending(request):
+    data = trending_now()
+    posts = Post.objects.for_feed().in_bulk(
+        [post_id for post_id, _ in data["posts"]]
+    )
+    groups = Group.objects.in_bulk(
+        [group_id for group_id, _ in data["groups"]]
+    )
+    context = {
+        "page": [
+            posts[post_id] for post_id, _ in data["posts"]
+            if post_id in posts
+        ],
+        "groups": [
+            groups[group_id] for group_id, _ in data["groups"]
+            if group_id in groups
+        ],
+    }
+    return render(request, "trending.html", context)
+
+
+# Полнотекстовый поиск по постам.
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page = search_page(query, request.GET.get("after"))
+    context = {
+        "page": page,
+        "query": query,
+    }
+    return render(request, "search.html", context)
+
+
 # Подписка на автора.
 @login_required
 def profile_follow(request, username):
@@ -147,6 +263,23 @@ def profile_follow(request, username):
     return redirect("profile", username)
 
 
+# Подписка и отписка от нескольких авторов одним запросом.
+@login_required
+@require_POST
+def follow_batch(request):
+    follow = request.POST.getlist("follow")
+    unfollow = request.POST.getlist("unfollow")
+    if len(follow) + len(unfollow) > settings.FOLLOW_BATCH_LIMIT:
+        return JsonResponse(
+            {"error": f"Не больше {settings.FOLLOW_BATCH_LIMIT} авторов."},
+            status=400
+        )
+    return JsonResponse({
+        "followed": follow_many(request.user, follow),
+        "unfollowed": unfollow_many(request.user, unfollow),
+    })
+
+
 # Отписка от автора.
 @login_required
 def profile_unfollow(request, username):
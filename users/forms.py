@@ -1,11 +1,51 @@
+import re
+
+from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
+from django.urls import get_resolver
 
 
 User = get_user_model()
 
+SEGMENT_RE = re.compile(r"[\w.-]+")
+
+
+def _first_segments(patterns):
+    for pattern in patterns:
+        segment = str(pattern.pattern).lstrip("^").split("/", 1)[0]
+        if segment:
+            # Имя, конвертер или регулярное выражение ничего не занимают.
+            if SEGMENT_RE.fullmatch(segment):
+                yield segment.lower()
+        elif hasattr(pattern, "url_patterns"):
+            yield from _first_segments(pattern.url_patterns)
+
+
+def reserved_usernames():
+    """Первые части адресов сайта из urlpatterns.
+
+    Профиль пользователя с таким именем (/<username>/) закрывали бы эти
+    страницы. STATIC_URL и MEDIA_URL занимаются, даже если их адресов
+    в urlpatterns нет, как при DEBUG = False.
+    """
+    segments = set(_first_segments(get_resolver().url_patterns))
+    for url in (settings.STATIC_URL, settings.MEDIA_URL):
+        segments.add(url.strip("/").split("/", 1)[0].lower())
+    segments.discard("")
+    return frozenset(segments)
+
 
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+    def clean_username(self):
+        username = self.cleaned_data["username"]
+        if username.lower() in reserved_usernames():
+            raise forms.ValidationError(
+                "Это имя занято адресом страницы сайта, выберите другое."
+            )
+        return username
@@ -1,3 +1,42 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from users.forms import reserved_usernames
+
+User = get_user_model()
+
+
+class SignUpTest(TestCase):
+    def signup(self, username):
+        return self.client.post(reverse("signup"), data={
+            "username": username,
+            "password1": "Zq8-long-password",
+            "password2": "Zq8-long-password",
+        })
+
+    def test_reserved_usernames_rejected(self):
+        """Имена, совпадающие с адресами страниц, заняты."""
+        for username in ("search", "Trending", "new"):
+            with self.subTest(username=username):
+                response = self.signup(username)
+                self.assertFormError(
+                    response, "form", "username",
+                    "Это имя занято адресом страницы сайта, выберите другое."
+                )
+        self.assertFalse(User.objects.exists())
+
+    def test_reserved_usernames_follow_urlpatterns(self):
+        """Занятые имена берутся из первых частей адресов сайта."""
+        self.assertEqual(
+            reserved_usernames(),
+            {
+                "about", "admin", "auth", "follow", "group", "media", "new",
+                "search", "static", "trending",
+            }
+        )
+
+    def test_signup(self):
+        response = self.signup("searcher")
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.filter(username="searcher").exists())
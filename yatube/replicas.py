@@ -0,0 +1,123 @@
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Cookie, пока жива которая, чтения пользователя идут в основную базу.
+PIN_COOKIE = 'pin_primary'
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    """Отправляет чтения лент в реплики, а всю запись — в основную базу.
+
+    В реплику попадают только запросы внутри read_from_replicas и только
+    если пользователь недавно ничего не записывал, иначе он мог бы не
+    увидеть свой же пост или комментарий из-за отставания реплики.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_replicas():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает в реплики вместе с данными.
+        return db == DEFAULT_DB_ALIAS
+
+
+def reading_replicas():
+    """Идут ли сейчас чтения в реплики.
+
+    То, что нарисовано по данным реплики, не кэшируется: реплика могла
+    отстать от поколений posts.feed_cache, которые сдвигаются сразу при
+    записи, и устаревшая страница осталась бы в кэше под новым ключом.
+    """
+    return bool(
+        settings.DATABASE_REPLICAS
+        and getattr(_state, 'replica_reads', False)
+        and not getattr(_state, 'pinned', False)
+    )
+
+
+@contextmanager
+def replica_reads():
+    previous = getattr(_state, 'replica_reads', False)
+    _state.replica_reads = True
+    try:
+        yield
+    finally:
+        _state.replica_reads = previous
+
+
+def read_from_replicas(view):
+    """Разрешает view читать из реплик."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет чтения пользователя за основной базой после записи.
+
+    Метка хранится в cookie, а не в сессии: запись сессии сама была бы
+    записью в базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.pinned = False
+        if _state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+
+def copy_database(source, target):
+    """Копирует файл SQLite source в target.
+
+    Копия делается через backup API одной транзакцией, поэтому открытые
+    соединения target видят либо старый, либо новый снимок целиком.
+    """
+    source = sqlite3.connect(source)
+    target = sqlite3.connect(target)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def replicate(alias):
+    """Заменяет репликацию в alias при локальной разработке."""
+    copy_database(
+        settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'],
+        settings.DATABASES[alias]['NAME']
+    )
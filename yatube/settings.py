@@ -36,7 +36,7 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'posts',
+    'posts.apps.PostsConfig',
     'about',
     'users',
     'django.contrib.admin',
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Снаружи SessionMiddleware, чтобы видеть и запись сессии.
+    'yatube.replicas.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,11 +91,31 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 с WAL и настройками PRAGMA, см. yatube/sqlite/base.py.
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переиспользуется между запросами.
+        'CONN_MAX_AGE': 60,
+    },
+    # Локальная реплика: копия db.sqlite3, которую обновляет
+    # manage.py replicate. В тестах это та же база, что и default.
+    'replica': {
+        'ENGINE': 'yatube.sqlite',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+
+# Алиасы из DATABASES, из которых читаются ленты. Пустой список —
+# все запросы идут в default.
+DATABASE_REPLICAS = []
+
+# Сколько секунд после записи чтения пользователя идут в default.
+DATABASE_REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -161,3 +183,117 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Фрагменты лент сбрасываются сигналами, поэтому срок жизни может быть
+# большим.
+FEED_CACHE_TIMEOUT = 60 * 5
+# Страницы index, group_posts, profile и post_view кэшируются целиком,
+# общими для всех зрителей, см. posts.page_cache.
+PAGE_CACHE_TIMEOUT = 60 * 5
+# Карточки постов сбрасываются по версии поста, см. posts.cards.
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+
+# Trending.
+# Вклад поста и комментария в оценку популярного затухает вдвое за
+# TRENDING_HALF_LIFE секунд, события старше TRENDING_WINDOW забываются.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WINDOW = 2 * 24 * 60 * 60
+TRENDING_POST_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 1.0
+# Множитель log(1 + подписчики автора) в весе нового поста.
+TRENDING_FOLLOWER_WEIGHT = 0.5
+# Как часто снимок в кэше пересчитывается из памяти процесса и как часто
+# память процесса перечитывается из базы.
+TRENDING_SNAPSHOT_INTERVAL = 60
+TRENDING_RESEED_INTERVAL = 10 * 60
+TRENDING_SIZE = 20
+
+
+# Pagination.
+POSTS_PER_PAGE = 10
+# Сколько первых страниц ленты доступны по номеру, дальше работают курсоры.
+PAGINATOR_NUMBERED_PAGES = 10
+# Навигация показывает по PAGINATOR_ENDS страниц с концов ленты и по
+# PAGINATOR_WINDOW с каждой стороны от текущей.
+PAGINATOR_WINDOW = 2
+PAGINATOR_ENDS = 1
+# На странице поста выводятся самые новые комментарии, остальные
+# догружаются порциями.
+COMMENTS_PREVIEW_SIZE = 5
+COMMENTS_PER_PAGE = 20
+
+
+# Comments write-behind.
+# Новые комментарии сначала пишутся в отдельную очередь SQLite и
+# переносятся в базу пачками, см. posts.comment_queue.
+COMMENTS_WRITE_BEHIND = False
+COMMENTS_QUEUE_PATH = os.path.join(BASE_DIR, 'comments_queue.sqlite3')
+# Раз в сколько секунд фоновый поток разбирает очередь; при None очередь
+# разбирает только команда flush_comments.
+COMMENTS_FLUSH_INTERVAL = 1.0
+COMMENTS_FLUSH_BATCH = 500
+# Через сколько секунд порцию очереди, которую процесс забрал, но не
+# записал, забирает другой процесс.
+COMMENTS_CLAIM_TIMEOUT = 300
+
+
+# Follow feed.
+# Посты авторов с большим числом подписчиков не раскладываются
+# по лентам при публикации, а подмешиваются при чтении.
+FOLLOW_FEED_FANOUT_LIMIT = 1000
+FOLLOW_FEED_BATCH_SIZE = 500
+# Сколько секунд процесс помнит подписки пользователя, не заглядывая
+# в общий кэш. 0 — только общий кэш.
+FOLLOW_GRAPH_LOCAL_TIMEOUT = 2
+# Сколько авторов можно передать в follow_batch за раз.
+FOLLOW_BATCH_LIMIT = 100
+# Сколько авторов советовать в блоке «Кого почитать».
+RECOMMENDATIONS_SIZE = 5
+# Вес подписки друга относительно сходства подписок, см.
+# posts.recommendations.score.
+RECOMMENDATIONS_FOF_WEIGHT = 1.0
+# Сколько авторов и подписчиков просматривает пересчет рекомендаций
+# после подписки, см. posts.recommendations.refresh.
+RECOMMENDATIONS_SAMPLE_SIZE = 100
+
+
+# Markup.
+# Функции, которые дополняют экранированный HTML текста постов
+# и комментариев, например ссылками. После их смены тексты
+# перерисовывает команда render_texts --all.
+POSTS_MARKUP_FILTERS = []
+
+
+# Search.
+# posts.search.LikeSearchBackend подходит для баз без FTS5.
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+
+# Post images.
+# Миниатюры готовятся заранее в фоновых потоках после сохранения поста,
+# шаблоны только подставляют готовые URL.
+POST_IMAGE_RENDITIONS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Каждая миниатюра дополнительно ужимается до этих ширин для srcset.
+POST_IMAGE_WIDTHS = (480, 720)
+# Форматы в порядке предпочтения: последний отдается в <img> браузерам
+# без поддержки остальных. AVIF пропускается, если Pillow его не умеет.
+POST_IMAGE_FORMATS = {
+    'AVIF': {'quality': 50},
+    'WEBP': {'quality': 75},
+    'JPEG': {'quality': 82, 'progressive': True},
+}
+POST_IMAGE_WORKERS = 2
+# Имена файлов миниатюр с расширениями для WebP и AVIF.
+THUMBNAIL_BACKEND = 'posts.renditions.RenditionBackend'
+# Без фоновых потоков миниатюры создаются прямо после коммита.
+POST_IMAGE_ASYNC = True
+# Ограничения загрузки проверяются по мере приема файла, см. posts.uploads.
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+# Сколько байт начала файла можно прочитать в поисках заголовка.
+POST_IMAGE_HEADER_SIZE = 64 * 1024
+POST_IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+POST_IMAGE_UPLOAD_QUALITY = 90
@@ -0,0 +1,30 @@
+from django.db.backends.sqlite3 import base
+
+# Применяются к каждому новому соединению. Переопределяются через
+# DATABASES[...]['OPTIONS']['pragmas'].
+DEFAULT_PRAGMAS = {
+    # Читатели не блокируются писателем и наоборот.
+    'journal_mode': 'WAL',
+    # В режиме WAL fsync при каждом коммите не нужен для целостности.
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение задает размер в КиБ: 64 МиБ.
+    'cache_size': -64 * 1024,
+    # Сколько миллисекунд ждать освобождения блокировки.
+    'busy_timeout': 5000,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с настройками PRAGMA для одновременных чтения и записи."""
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn